@@ -1,4 +1,9 @@
-from rectpack.geometry import Rectangle
+import bisect
+import collections
+import itertools
+
+from rectpack.geometry import Point as P
+from rectpack.geometry import HSegment, Rectangle
 from rectpack.maxrects import MaxRects
 from rectpack.skyline import Skyline
 
@@ -155,22 +160,86 @@ class CornerPointsMR(MaxRects):
         return candidates, fitting_max_rects, self.rectangles
 
 
-class CornerPointsSL(Skyline):
-    # TODO implement right view apart from the top view
+class _SkylineProfile(Skyline):
+    """Skyline that only follows the outline of the placed rectangles, they
+    can be placed below it and the segments under them are raised to the
+    rectangle top but never lowered.
+    """
+    def _add_skyline(self, rect):
+        """
+        Arguments:
+            rect (Rectangle): Placed rectangle
+        """
+        skylineq = collections.deque([])
+
+        lefts = self._skyline_lefts
+        start = max(bisect.bisect_right(lefts, rect.left)-2, 0)
+        end = min(bisect.bisect_left(lefts, rect.right)+1, len(lefts))
+
+        for sky in self._skyline[start:end]:
+            left, right = max(sky.left, rect.left), min(sky.right, rect.right)
+            if left >= right or sky.top >= rect.top:
+                self._merge_skyline(skylineq, sky)
+                continue
+
+            if sky.left < left:
+                self._merge_skyline(skylineq, HSegment(sky.start, left-sky.left))
+            self._merge_skyline(skylineq, HSegment(P(left, rect.top), right-left))
+            if right < sky.right:
+                self._merge_skyline(skylineq,
+                        HSegment(P(right, sky.top), sky.right-right))
+
+        self._replace_skyline(start, end, list(skylineq))
+
+
+class CornerPointsSL(_SkylineProfile):
+    """Candidate positions from the top view, rectangles resting on the
+    skyline, and from the right view, rectangles pushed left against the
+    profile of the rectangles seen from the right side.
+
+    The right view is kept as a second skyline with x and y swapped, updated
+    with each placed rectangle the same way as the top view.
+    """
+    def _candidates(self, width, height):
+        """
+        Candidate positions for a rectangle from both views, positions found
+        in both are only returned once.
+
+        Returns:
+            list: Rectangles in valid positions
+        """
+        top = (p[0] for p in self._generate_placements(width, height))
+        right = (Rectangle(r.y, r.x, width, height) for r, _, _ in
+                self._right_view._generate_placements(height, width))
+
+        seen = set()
+        candidates = []
+        for rect in itertools.chain(top, right):
+            key = (rect.x, rect.y)
+            if key not in seen:
+                seen.add(key)
+                candidates.append(rect)
+        return candidates
+
     def _select_position(self, width, height):
         """
-        Search for the placement with the bes fitness for the rectangle.
+        Search for all the candidate positions for the rectangle.
 
         Returns:
-            tuple (Rectangle, fitness) - Rectangle placed in the fittest position
-            None - Rectangle couldn't be placed
+            tuple (list, None) - Rectangles in every candidate position
+            (None, None) - Rectangle couldn't be placed
         """
-        positions = self._generate_placements(width, height)
+        positions = self._candidates(width, height)
         if self.rot and width != height:
-            positions += self._generate_placements(height, width)
+            positions += self._candidates(height, width)
         if not positions:
             return None, None
-        return [p[0] for p in positions], None
+        return positions, None
+
+    def _add_skyline(self, rect):
+        super(CornerPointsSL, self)._add_skyline(rect)
+        self._right_view._add_skyline(
+                Rectangle(rect.y, rect.x, rect.height, rect.width))
 
     def select_best_position(self, width, height):
         if self._waste_management:
@@ -182,5 +251,11 @@ class CornerPointsSL(Skyline):
             return None
 
         rects, _ = self._select_position(width, height)
+        if rects is None:
+            return None
 
         return list(rects)
+
+    def reset(self):
+        super(CornerPointsSL, self).reset()
+        self._right_view = _SkylineProfile(self.height, self.width, rot=False)
@@ -1,5 +1,7 @@
 from .pack_algo import PackingAlgorithm
 from .geometry import Rectangle
+from .index import SizeIndex, ExactSizeIndex
+import bisect
 import itertools
 import operator
 
@@ -10,6 +12,15 @@ class Guillotine(PackingAlgorithm):
     For a more detailed explanation of the algorithm used, see:
     Jukka Jylanki - A Thousand Ways to Pack the Bin (February 27, 2010)
     """
+
+    # Set when a perfect fit always has a better fitness than any other
+    # section, so it can be selected directly from the exact size index.
+    _exact_fit_first = False
+
+    # Set when _section_key and _fitness_bound are implemented, so the best
+    # section can be found with a bounded search over the sorted sections.
+    _ordered_search = False
+
     def __init__(self, width, height, rot=True, merge=True, *args, **kwargs):
         """
         Arguments:
@@ -19,7 +30,87 @@ class Guillotine(PackingAlgorithm):
         """
         self._merge = merge
         super(Guillotine, self).__init__(width, height, rot, *args, **kwargs)
-        
+
+    @property
+    def _sections(self):
+        """
+        List of free sections, changes are made through _index_section and
+        _unindex_section so listeners and indexes stay in sync.
+        """
+        return self._free_sections
+
+    @_sections.setter
+    def _sections(self, sections):
+        if self._listeners:
+            for s in self._free_sections:
+                for listener in self._listeners:
+                    listener.region_removed(self, s)
+
+        self._free_sections = list(sections)
+        self._clear_indexes()
+        for s in self._free_sections:
+            self._index_section(s)
+
+    def _clear_indexes(self):
+        self._size_index = SizeIndex()
+        self._exact_index = ExactSizeIndex()
+        self._next_seq = 0
+        self._seqs = {}          # id(section) -> sequence number
+        self._section_seqs = []  # Sequence number of each free section
+        self._edges = {}         # Edge key -> section
+        self._ordered = []       # Sorted (section key, sequence number, section)
+
+    @staticmethod
+    def _edge_keys(section):
+        """
+        Returns:
+            tuple: Keys for the bottom, top, left and right edges
+        """
+        return (('bottom', section.left, section.width, section.bottom),
+                ('top', section.left, section.width, section.top),
+                ('left', section.bottom, section.height, section.left),
+                ('right', section.bottom, section.height, section.right))
+
+    def _index_section(self, section):
+        # Sections are always indexed after being appended to the list, so
+        # sequence numbers follow the free section list order.
+        self._size_index.add(section)
+        self._exact_index.add(section)
+        seq = self._next_seq
+        self._next_seq += 1
+        self._seqs[id(section)] = seq
+        self._section_seqs.append(seq)
+        for key in self._edge_keys(section):
+            self._edges[key] = section
+        bisect.insort(self._ordered, (self._section_key(section), seq, section))
+        self._version += 1
+        for listener in self._listeners:
+            listener.region_added(self, section)
+
+    def _unindex_section(self, section):
+        self._size_index.remove(section)
+        self._exact_index.remove(section)
+        seq = self._seqs.pop(id(section))
+        ordered = self._ordered
+        del ordered[bisect.bisect_left(ordered, (self._section_key(section), seq))]
+        for key in self._edge_keys(section):
+            if self._edges.get(key) is section:
+                del self._edges[key]
+        self._version += 1
+        for listener in self._listeners:
+            listener.region_removed(self, section)
+
+    def _neighbours(self, section):
+        """
+        Returns:
+            list: Free sections sharing a whole edge with section
+        """
+        edges = self._edges
+        keys = (('top', section.left, section.width, section.bottom),
+                ('bottom', section.left, section.width, section.top),
+                ('right', section.bottom, section.height, section.left),
+                ('left', section.bottom, section.height, section.right))
+        return [edges[k] for k in keys if k in edges]
 
     def _add_section(self, section):
         """Adds a new section to the free section list, but before that and if 
@@ -28,17 +119,44 @@ class Guillotine(PackingAlgorithm):
         remaining sections until the operation fails. The result is then 
         appended to the list.
 
+        Free sections never overlap, so the only ones that can be joined are
+        those sharing a whole edge with the section, they are found with the
+        edge index. They are joined in free section list order, the same as
+        testing every section in the list on each pass.
+
         Arguments:
             section (Rectangle): New free section.
         """
         section.rid = 0     
-        plen = 0
-
-        while self._merge and self._sections and plen != len(self._sections):
-            plen = len(self._sections)
-            self._sections = [s for s in self._sections if not section.join(s)]
-        self._sections.append(section)
-
+        seqs = self._seqs
+        last = -1       # Sequence number of the last section joined
+        joined = False  # Any section joined during the current pass
+
+        while self._merge:
+            candidates = [s for s in self._neighbours(section) if seqs[id(s)] > last]
+            if candidates:
+                s = min(candidates, key=lambda s: seqs[id(s)])
+                last = seqs[id(s)]
+                section.join(s)
+                self._remove_section(s)
+                joined = True
+            elif joined:
+                last, joined = -1, False
+            else:
+                break
+
+        self._free_sections.append(section)
+        self._index_section(section)
+
+    def _remove_section(self, section):
+        """
+        Arguments:
+            section (Rectangle): Free section to remove
+        """
+        i = bisect.bisect_left(self._section_seqs, self._seqs[id(section)])
+        del self._free_sections[i]
+        del self._section_seqs[i]
+        self._unindex_section(section)
 
     def _split_horizontal(self, section, width, height):
         """For an horizontal split the rectangle is placed in the lower
@@ -129,6 +247,54 @@ class Guillotine(PackingAlgorithm):
         """
         raise NotImplementedError
 
+    def _section_key(self, section):
+        """
+        Key used to sort the free sections for _ordered_search.
+        """
+        return section.area()
+
+    def _min_key(self, width, height):
+        """
+        Returns:
+            Smallest section key where the rectangle could fit
+        """
+        raise NotImplementedError
+
+    def _fitness_bound(self, key, width, height):
+        """
+        Returns:
+            Lower bound for the fitness of the rectangle in any section with
+            the given key, it must not decrease as the key grows.
+        """
+        raise NotImplementedError
+
+    def _ordered_fit(self, width, height):
+        """
+        Search the free sections in key order, from the first one where the
+        rectangle could fit until the fitness bound is worse than the best
+        fitness found.
+
+        Returns:
+            (fitness, seq, section): Section with the best fitness, the
+                first one in free section list order on ties.
+            None: Rectangle doesn't fit in any section
+        """
+        ordered = self._ordered
+        best = None
+        start = bisect.bisect_left(ordered, (self._min_key(width, height),))
+        for key, seq, section in itertools.islice(ordered, start, None):
+            if best is not None and \
+                    self._fitness_bound(key, width, height) > best[0]:
+                break
+            fitness = self._section_fitness(section, width, height)
+            if fitness is None:
+                continue
+            if best is None or fitness < best[0] or \
+                    (fitness == best[0] and seq < best[1]):
+                best = (fitness, seq, section)
+
+        return best
+
     def _select_fittest_section(self, w, h):
         """Calls _section_fitness for each of the sections in free section 
         list. Returns the section with the minimal fitness value, all the rest 
@@ -145,6 +311,25 @@ class Guillotine(PackingAlgorithm):
                 section (Rectangle): Section with best fitness
                 was_rotated (bool): The rectangle was rotated 
         """
+        if self._exact_fit_first:
+            # Sections are indexed in free section list order
+            exact = self._exact_index.get(w, h)
+            if exact:
+                return exact[0], False
+            exact = self._exact_index.get(h, w) if self.rot else None
+            if exact:
+                return exact[0], True
+
+        if self._ordered_search:
+            # Normal orientation wins ties
+            best, rotated = self._ordered_fit(w, h), False
+            fit = self._ordered_fit(h, w) if self.rot else None
+            if fit is not None and (best is None or fit[0] < best[0]):
+                best, rotated = fit, True
+            if best is None:
+                return None, None
+            return best[2], rotated
+
         fitn = ((self._section_fitness(s, w, h), s, False) for s in self._sections 
                 if self._section_fitness(s, w, h) is not None)
         fitr = ((self._section_fitness(s, h, w), s, True) for s in self._sections 
@@ -177,9 +362,16 @@ class Guillotine(PackingAlgorithm):
             None: If the rectangle couldn be placed.
         """
         assert(width > 0 and height >0)
+        if not self._may_fit(width, height):
+            return None
 
-        # Obtain the best section to place the rectangle.
-        section, rotated = self._select_fittest_section(width, height)
+        # Obtain the best section to place the rectangle, unless fitness()
+        # already did it for this rectangle.
+        placement = self._cached_placement(width, height)
+        if placement is None:
+            placement = self._select_fittest_section(width, height)
+
+        section, rotated = placement
         if not section:
             return None
         
@@ -187,7 +379,7 @@ class Guillotine(PackingAlgorithm):
             width, height = height, width
         
         # Remove section, split and store results
-        self._sections.remove(section)
+        self._remove_section(section)
         self._split(section, width, height)
        
         # Store rectangle in the selected position
@@ -195,6 +387,28 @@ class Guillotine(PackingAlgorithm):
         self.rectangles.append(rect)
         return rect
 
+    def capacity(self):
+        index = self._size_index
+        return index.max_width(), index.max_height(), index.max_area()
+
+    def _free_regions(self):
+        return self._sections
+
+    def _region_fitness(self, section, width, height):
+        fitness = self._section_fitness(section, width, height)
+        if self.rot:
+            rotated = self._section_fitness(section, height, width)
+            if fitness is None or (rotated is not None and rotated < fitness):
+                fitness = rotated
+        return fitness
+
+    def fitness_many(self, sizes):
+        """
+        Fitness for several rectangles at once, scored in a single pass
+        over the free sections (see PackingAlgorithm._fitness_many_by_region).
+        """
+        return self._fitness_many_by_region(sizes)
+
     def fitness(self, width, height):
         """
         In guillotine algorithm case, returns the min of the fitness of all 
@@ -202,9 +416,12 @@ class Guillotine(PackingAlgorithm):
         (if rotation enabled.)
         """
         assert(width > 0 and height > 0)
+        if not self._may_fit(width, height):
+            return None
 
         # Get best fitness section.
-        section, rotated = self._select_fittest_section(width, height)
+        section, rotated = self._cache_placement(width, height,
+                self._select_fittest_section(width, height))
         if not section:
             return None
         
@@ -226,6 +443,15 @@ class GuillotineBaf(Guillotine):
     """Implements Best Area Fit (BAF) section selection criteria for 
     Guillotine algorithm.
     """
+    _exact_fit_first = True
+    _ordered_search = True
+
+    def _min_key(self, width, height):
+        return width*height
+
+    def _fitness_bound(self, area, width, height):
+        return area-width*height
+
     def _section_fitness(self, section, width, height):
         if width > section.width or height > section.height:
             return None
@@ -236,6 +462,18 @@ class GuillotineBlsf(Guillotine):
     """Implements Best Long Side Fit (BLSF) section selection criteria for 
     Guillotine algorithm.
     """
+    _exact_fit_first = True
+    _ordered_search = True
+
+    def _section_key(self, section):
+        return max(section.width, section.height)
+
+    def _min_key(self, width, height):
+        return max(width, height)
+
+    def _fitness_bound(self, long_side, width, height):
+        return long_side-max(width, height)
+
     def _section_fitness(self, section, width, height):
         if width > section.width or height > section.height:
             return None
@@ -246,6 +484,17 @@ class GuillotineBssf(Guillotine):
     """Implements Best Short Side Fit (BSSF) section selection criteria for 
     Guillotine algorithm.
     """
+    _ordered_search = True
+
+    def _section_key(self, section):
+        return min(section.width, section.height)
+
+    def _min_key(self, width, height):
+        return min(width, height)
+
+    def _fitness_bound(self, short_side, width, height):
+        return short_side-max(width, height)
+
     def _section_fitness(self, section, width, height):
         if width > section.width or height > section.height:
             return None
@@ -0,0 +1,209 @@
+import numpy as np
+
+from .geometry import Rectangle
+from .np_utils import CoordinateArrays
+from .guillotine import Guillotine, GuillotineBaf, GuillotineBlsf, \
+    GuillotineBssf, GuillotineSas, GuillotineLas, GuillotineSlas, \
+    GuillotineLlas, GuillotineMaxas, GuillotineMinas
+
+
+class GuillotineNp(CoordinateArrays, Guillotine):
+    """Guillotine variant storing the free sections in parallel NumPy arrays
+    (x, y, width, height) instead of Rectangle objects. The fitness of every
+    section for both orientations is computed in one vectorized pass, and
+    merge partners are found comparing the section edges with all the rows.
+
+    Rows are kept in the same order as Guillotine._sections so both backends
+    return the same placements. Coordinates are stored as int64 when the
+    surface and rectangle dimensions are integers, float64 otherwise.
+    """
+
+    _arrays = ('_sx', '_sy', '_sw', '_sh')
+
+    def _fitness_array(self, sw, sh, width, height):
+        """
+        Vectorized _section_fitness, only called for the sections where the
+        rectangle fits.
+
+        Arguments:
+            sw (numpy.ndarray): Sections width
+            sh (numpy.ndarray): Sections height
+            width (int, float): Rectangle width
+            height (int, float): Rectangle height
+
+        Returns:
+            numpy.ndarray: Fitness of each section
+        """
+        raise NotImplementedError
+
+    @property
+    def _sections(self):
+        return [Rectangle(*s) for s in zip(self._sx.tolist(), self._sy.tolist(),
+            self._sw.tolist(), self._sh.tolist())]
+
+    @_sections.setter
+    def _sections(self, sections):
+        sections = list(sections)
+        values = [v for s in sections for v in (s.x, s.y, s.width, s.height)]
+        dtype = self._dtype(*values)
+
+        self._sx = np.array([s.x for s in sections], dtype=dtype)
+        self._sy = np.array([s.y for s in sections], dtype=dtype)
+        self._sw = np.array([s.width for s in sections], dtype=dtype)
+        self._sh = np.array([s.height for s in sections], dtype=dtype)
+        self._version += 1
+
+    def _delete_row(self, i):
+        self._sx = np.delete(self._sx, i)
+        self._sy = np.delete(self._sy, i)
+        self._sw = np.delete(self._sw, i)
+        self._sh = np.delete(self._sh, i)
+        self._version += 1
+
+    def _add_section(self, section):
+        """
+        Adds a new section to the free section list, see
+        Guillotine._add_section. Each join takes the first section after the
+        last one joined sharing a whole edge with the section, a new pass
+        starts from the first row if any was joined.
+
+        Arguments:
+            section (Rectangle): New free section.
+        """
+        x, y, w, h = section.x, section.y, section.width, section.height
+        self._promote(x, y, w, h)
+
+        start = 0       # First row not tested in the current pass
+        joined = False  # Any section joined during the current pass
+        while self._merge and len(self._sx):
+            sx, sy, sw, sh = self._sx, self._sy, self._sw, self._sh
+            column = (sx == x) & (sw == w) & ((sy == y+h) | (sy+sh == y))
+            row = (sy == y) & (sh == h) & ((sx == x+w) | (sx+sw == x))
+            candidates = np.flatnonzero((column | row)[start:])
+            if len(candidates):
+                i = start+candidates[0].item()
+                if column[i]:
+                    y, h = min(y, sy[i].item()), h+sh[i].item()
+                else:
+                    x, w = min(x, sx[i].item()), w+sw[i].item()
+                self._delete_row(i)
+                start, joined = i, True
+            elif joined:
+                start, joined = 0, False
+            else:
+                break
+
+        self._sx = np.append(self._sx, x)
+        self._sy = np.append(self._sy, y)
+        self._sw = np.append(self._sw, w)
+        self._sh = np.append(self._sh, h)
+        self._version += 1
+
+    def _remove_section(self, section):
+        """
+        Arguments:
+            section (Rectangle): Free section to remove
+        """
+        match = (self._sx == section.x) & (self._sy == section.y) & \
+            (self._sw == section.width) & (self._sh == section.height)
+        self._delete_row(np.flatnonzero(match)[0])
+
+    def _select_fittest_section(self, w, h):
+        """
+        Score every section for both orientations and return the one with
+        the best fitness, see Guillotine._select_fittest_section.
+        """
+        sx, sy, sw, sh = self._sx, self._sy, self._sw, self._sh
+
+        fitn = np.flatnonzero((sw >= w) & (sh >= h))
+        if self.rot:
+            fitr = np.flatnonzero((sw >= h) & (sh >= w))
+        else:
+            fitr = fitn[:0]
+
+        if not len(fitn) and not len(fitr):
+            return None, None
+
+        # argmin returns the first minimum, normal orientation first, the
+        # same order as the sections are scored in Guillotine.
+        score = np.concatenate((
+            self._fitness_array(sw[fitn], sh[fitn], w, h),
+            self._fitness_array(sw[fitr], sh[fitr], h, w)))
+        best = np.argmin(score).item()
+        rotated = best >= len(fitn)
+        i = fitr[best-len(fitn)] if rotated else fitn[best]
+
+        section = Rectangle(sx[i].item(), sy[i].item(), sw[i].item(),
+                sh[i].item())
+        return section, rotated
+
+    def add_rect(self, width, height, rid=None):
+        self._promote(width, height)
+        return super(GuillotineNp, self).add_rect(width, height, rid)
+
+    def capacity(self):
+        if not len(self._sx):
+            return 0, 0, 0
+        return (self._sw.max().item(), self._sh.max().item(),
+            (self._sw*self._sh).max().item())
+
+    def _free_regions(self):
+        # Sections aren't objects, changes can't be reported by region
+        return None
+
+
+
+class GuillotineBafNp(GuillotineNp, GuillotineBaf):
+    """Vectorized GuillotineBaf"""
+    def _fitness_array(self, sw, sh, width, height):
+        return sw*sh-width*height
+
+
+class GuillotineBlsfNp(GuillotineNp, GuillotineBlsf):
+    """Vectorized GuillotineBlsf"""
+    def _fitness_array(self, sw, sh, width, height):
+        return np.maximum(sw-width, sh-height)
+
+
+class GuillotineBssfNp(GuillotineNp, GuillotineBssf):
+    """Vectorized GuillotineBssf"""
+    def _fitness_array(self, sw, sh, width, height):
+        return np.minimum(sw-width, sh-height)
+
+
+class GuillotineBssfSasNp(GuillotineBssfNp, GuillotineSas):
+    pass
+class GuillotineBssfLasNp(GuillotineBssfNp, GuillotineLas):
+    pass
+class GuillotineBssfSlasNp(GuillotineBssfNp, GuillotineSlas):
+    pass
+class GuillotineBssfLlasNp(GuillotineBssfNp, GuillotineLlas):
+    pass
+class GuillotineBssfMaxasNp(GuillotineBssfNp, GuillotineMaxas):
+    pass
+class GuillotineBssfMinasNp(GuillotineBssfNp, GuillotineMinas):
+    pass
+class GuillotineBlsfSasNp(GuillotineBlsfNp, GuillotineSas):
+    pass
+class GuillotineBlsfLasNp(GuillotineBlsfNp, GuillotineLas):
+    pass
+class GuillotineBlsfSlasNp(GuillotineBlsfNp, GuillotineSlas):
+    pass
+class GuillotineBlsfLlasNp(GuillotineBlsfNp, GuillotineLlas):
+    pass
+class GuillotineBlsfMaxasNp(GuillotineBlsfNp, GuillotineMaxas):
+    pass
+class GuillotineBlsfMinasNp(GuillotineBlsfNp, GuillotineMinas):
+    pass
+class GuillotineBafSasNp(GuillotineBafNp, GuillotineSas):
+    pass
+class GuillotineBafLasNp(GuillotineBafNp, GuillotineLas):
+    pass
+class GuillotineBafSlasNp(GuillotineBafNp, GuillotineSlas):
+    pass
+class GuillotineBafLlasNp(GuillotineBafNp, GuillotineLlas):
+    pass
+class GuillotineBafMaxasNp(GuillotineBafNp, GuillotineMaxas):
+    pass
+class GuillotineBafMinasNp(GuillotineBafNp, GuillotineMinas):
+    pass
@@ -0,0 +1,222 @@
+from .geometry import Rectangle
+from .guillotine import Guillotine, GuillotineBssfSas, GuillotineBssfLas, \
+    GuillotineBssfSlas, GuillotineBssfLlas, GuillotineBssfMaxas, \
+    GuillotineBssfMinas, GuillotineBlsfSas, GuillotineBlsfLas, \
+    GuillotineBlsfSlas, GuillotineBlsfLlas, GuillotineBlsfMaxas, \
+    GuillotineBlsfMinas, GuillotineBafSas, GuillotineBafLas, \
+    GuillotineBafSlas, GuillotineBafLlas, GuillotineBafMaxas, \
+    GuillotineBafMinas
+
+
+class CutNode(object):
+    """Node of a guillotine cut tree, a region of the surface that is either
+    a free section, a placed rectangle, or cut in two by a straight line
+    from side to side.
+
+    region: Rectangle covered by the node.
+    axis: 'h' for a horizontal cut, 'v' for vertical, None for leaves.
+    position: y coordinate of a horizontal cut, x of a vertical cut.
+    children: Regions at each side of the cut, bottom/left one first.
+    section: Free section when the node is a free leaf.
+    rect: Placed rectangle when the node is a used leaf.
+    max_width, max_height, max_area: Largest free width, height, and area
+        of the sections in the subtree (not necessarily the same section).
+    """
+
+    def __init__(self, region, parent=None):
+        self.region = region
+        self.parent = parent
+        self.axis = None
+        self.position = None
+        self.children = []
+        self.section = None
+        self.rect = None
+        self.max_width = 0
+        self.max_height = 0
+        self.max_area = 0
+
+    def cut(self, axis, position):
+        """
+        Cut the node region in two
+
+        Arguments:
+            axis (str): 'h' for horizontal, 'v' for vertical
+            position (int, float): Cut y or x coordinate
+
+        Returns:
+            (CutNode, CutNode): bottom and top, or left and right children
+        """
+        r = self.region
+        if axis == 'h':
+            first = Rectangle(r.x, r.y, r.width, position-r.y)
+            second = Rectangle(r.x, position, r.width, r.top-position)
+        else:
+            first = Rectangle(r.x, r.y, position-r.x, r.height)
+            second = Rectangle(position, r.y, r.right-position, r.height)
+
+        self.axis, self.position = axis, position
+        self.children = [CutNode(first, self), CutNode(second, self)]
+        return tuple(self.children)
+
+    def update(self):
+        """Recompute free space maximums for this node and its ancestors"""
+        node = self
+        while node is not None:
+            if node.section is not None:
+                s = node.section
+                node.max_width, node.max_height = s.width, s.height
+                node.max_area = s.area()
+            elif node.children:
+                node.max_width = max(c.max_width for c in node.children)
+                node.max_height = max(c.max_height for c in node.children)
+                node.max_area = max(c.max_area for c in node.children)
+            else:
+                node.max_width = node.max_height = node.max_area = 0
+            node = node.parent
+
+
+class GuillotineTree(Guillotine):
+    """Guillotine variant that keeps the cut tree built by the splits, so
+    the cuts can be exported in an order they can be made. Each node stores
+    the maximum free width, height and area of its subtree, the surface 
+    capacity is read from the root. Sections are still selected with the 
+    Guillotine section indexes.
+
+    Sections aren't merged, a merged section wouldn't be a node of the
+    tree, so placements are the same as with Guillotine(merge=False).
+    """
+
+    def __init__(self, width, height, rot=True, merge=False, *args, **kwargs):
+        if merge:
+            raise ValueError("GuillotineTree free sections can't be merged")
+        super(GuillotineTree, self).__init__(width, height, rot, False,
+                *args, **kwargs)
+
+    def _free_node(self, node):
+        """Make node a free section leaf"""
+        node.section = Rectangle(node.region.x, node.region.y,
+                node.region.width, node.region.height)
+        self._nodes[id(node.section)] = node
+        self._add_section(node.section)
+
+    def _place_node(self, section, width, height, first_axis):
+        """
+        Cut the node of a section to place a rectangle in its lower left
+        corner, the free section over the rectangle is added before the one
+        to its right the same as Guillotine._split_horizontal and
+        _split_vertical.
+
+        Arguments:
+            section (Rectangle): Free section already removed
+            width (int, float): Rectangle width
+            height (int, float): Rectangle height
+            first_axis (str): Axis of the first cut, 'h' or 'v'
+        """
+        node = self._nodes.pop(id(section))
+        node.section = None
+        cuts = {'h': section.y+height, 'v': section.x+width}
+        ends = {'h': section.top, 'v': section.right}
+        placed = node
+
+        free = {}
+        for axis in (first_axis, 'v' if first_axis == 'h' else 'h'):
+            if cuts[axis] < ends[axis]:
+                placed, free[axis] = placed.cut(axis, cuts[axis])
+
+        self._placed_node = placed
+        placed.update()
+        for axis in ('h', 'v'):
+            if axis in free:
+                self._free_node(free[axis])
+                free[axis].update()
+
+    def _split_horizontal(self, section, width, height):
+        self._place_node(section, width, height, 'h')
+
+    def _split_vertical(self, section, width, height):
+        self._place_node(section, width, height, 'v')
+
+    def add_rect(self, width, height, rid=None):
+        rect = super(GuillotineTree, self).add_rect(width, height, rid)
+        if rect is not None:
+            self._placed_node.rect = rect
+        return rect
+
+    def capacity(self):
+        root = self._root
+        return root.max_width, root.max_height, root.max_area
+
+    def cut_tree(self):
+        """
+        Returns:
+            CutNode: Root of the cut tree, covering the whole surface
+        """
+        return self._root
+
+    def cut_sequence(self):
+        """
+        Cuts in the order they can be made, each one goes from side to side
+        of a piece produced by a previous cut.
+
+        Returns:
+            list: [(x, y, width, height, axis, position), ...]
+                x, y, width, height: Piece being cut
+                axis: 'h' for horizontal, 'v' for vertical
+                position: y coordinate of a horizontal cut, x of a vertical one
+        """
+        cuts = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node.axis is None:
+                continue
+            r = node.region
+            cuts.append((r.x, r.y, r.width, r.height, node.axis, node.position))
+            stack.extend(reversed(node.children))
+        return cuts
+
+    def reset(self):
+        super(GuillotineTree, self).reset()
+        self._placed_node = None
+        self._root = CutNode(Rectangle(0, 0, self.width, self.height))
+        self._root.section = self._sections[0]
+        self._nodes = {id(self._root.section): self._root} # id(section) -> leaf
+        self._root.update()
+
+
+class GuillotineTreeBssfSas(GuillotineTree, GuillotineBssfSas):
+    pass
+class GuillotineTreeBssfLas(GuillotineTree, GuillotineBssfLas):
+    pass
+class GuillotineTreeBssfSlas(GuillotineTree, GuillotineBssfSlas):
+    pass
+class GuillotineTreeBssfLlas(GuillotineTree, GuillotineBssfLlas):
+    pass
+class GuillotineTreeBssfMaxas(GuillotineTree, GuillotineBssfMaxas):
+    pass
+class GuillotineTreeBssfMinas(GuillotineTree, GuillotineBssfMinas):
+    pass
+class GuillotineTreeBlsfSas(GuillotineTree, GuillotineBlsfSas):
+    pass
+class GuillotineTreeBlsfLas(GuillotineTree, GuillotineBlsfLas):
+    pass
+class GuillotineTreeBlsfSlas(GuillotineTree, GuillotineBlsfSlas):
+    pass
+class GuillotineTreeBlsfLlas(GuillotineTree, GuillotineBlsfLlas):
+    pass
+class GuillotineTreeBlsfMaxas(GuillotineTree, GuillotineBlsfMaxas):
+    pass
+class GuillotineTreeBlsfMinas(GuillotineTree, GuillotineBlsfMinas):
+    pass
+class GuillotineTreeBafSas(GuillotineTree, GuillotineBafSas):
+    pass
+class GuillotineTreeBafLas(GuillotineTree, GuillotineBafLas):
+    pass
+class GuillotineTreeBafSlas(GuillotineTree, GuillotineBafSlas):
+    pass
+class GuillotineTreeBafLlas(GuillotineTree, GuillotineBafLlas):
+    pass
+class GuillotineTreeBafMaxas(GuillotineTree, GuillotineBafMaxas):
+    pass
+class GuillotineTreeBafMinas(GuillotineTree, GuillotineBafMinas):
+    pass
@@ -0,0 +1,456 @@
+import bisect
+
+
+class _QuadNode(object):
+
+    __slots__ = ('x0', 'y0', 'x1', 'y1', 'xm', 'ym', 'depth', 'items',
+                 'children')
+
+    def __init__(self, x0, y0, x1, y1, depth):
+        self.x0 = x0
+        self.y0 = y0
+        self.x1 = x1
+        self.y1 = y1
+        self.xm = (x0+x1)/2
+        self.ym = (y0+y1)/2
+        self.depth = depth
+        self.items = {}     # id(rect) -> rect
+        self.children = None
+
+    def child(self, rect, create=True):
+        """
+        Return the quadrant fully containing rect, creating it when
+        needed, or None if rect straddles one of the node axis (or lies
+        outside the node).
+        """
+        right, top = rect.x+rect.width, rect.y+rect.height
+
+        if rect.x >= self.x0 and right <= self.xm:
+            east = 0
+        elif rect.x >= self.xm and right <= self.x1:
+            east = 1
+        else:
+            return None
+
+        if rect.y >= self.y0 and top <= self.ym:
+            north = 0
+        elif rect.y >= self.ym and top <= self.y1:
+            north = 2
+        else:
+            return None
+
+        if self.children is None:
+            if not create:
+                return None
+            self.children = [None, None, None, None]
+
+        quadrant = east+north
+        node = self.children[quadrant]
+        if node is None and create:
+            x0, x1 = (self.xm, self.x1) if east else (self.x0, self.xm)
+            y0, y1 = (self.ym, self.y1) if north else (self.y0, self.ym)
+            node = _QuadNode(x0, y0, x1, y1, self.depth+1)
+            self.children[quadrant] = node
+        return node
+
+
+class QuadTree(object):
+    """MX-CIF quadtree used to find all the rectangles overlapping a region
+    without testing every one of them. Each rectangle is stored in the
+    smallest node that fully contains it, so big rectangles stay close to
+    the root while small ones sink towards the leaves.
+
+    Rectangles are tracked by identity, they must not be moved or resized
+    while they are stored in the tree.
+    """
+
+    def __init__(self, x, y, width, height, max_depth=8):
+        """
+        Arguments:
+            x (int, float): Indexed region left edge
+            y (int, float): Indexed region bottom edge
+            width (int, float): Indexed region width
+            height (int, float): Indexed region height
+            max_depth (int): Maximum number of subdivisions
+        """
+        self._root = _QuadNode(x, y, x+width, y+height, 0)
+        self._max_depth = max_depth
+        self._nodes = {}    # id(rect) -> node containing rect
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, rect):
+        return id(rect) in self._nodes
+
+    def add(self, rect):
+        """
+        Arguments:
+            rect (Rectangle): Rectangle to index
+        """
+        node = self._root
+        while node.depth < self._max_depth:
+            child = node.child(rect)
+            if child is None:
+                break
+            node = child
+
+        node.items[id(rect)] = rect
+        self._nodes[id(rect)] = node
+
+    def remove(self, rect):
+        """
+        Arguments:
+            rect (Rectangle): Previously indexed rectangle
+        """
+        node = self._nodes.pop(id(rect))
+        del node.items[id(rect)]
+
+    def intersecting(self, rect):
+        """
+        Find indexed rectangles intersecting rect, rectangles only touching
+        by their edges are not considered to be intersecting.
+
+        Arguments:
+            rect (Rectangle): Query rectangle
+
+        Returns:
+            list: Intersecting rectangles
+        """
+        left, bottom = rect.x, rect.y
+        right, top = rect.x+rect.width, rect.y+rect.height
+
+        found = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            for r in node.items.values():
+                if r.x < right and r.x+r.width > left and \
+                        r.y < top and r.y+r.height > bottom:
+                    found.append(r)
+
+            if node.children is None:
+                continue
+
+            for c in node.children:
+                if c is not None and c.x0 < right and c.x1 > left and \
+                        c.y0 < top and c.y1 > bottom:
+                    stack.append(c)
+
+        return found
+
+    def _path(self, rect):
+        """
+        Returns:
+            list: Existing nodes from the root to the node where rect
+                would be stored.
+        """
+        path = [self._root]
+        while path[-1].depth < self._max_depth:
+            child = path[-1].child(rect, create=False)
+            if child is None:
+                break
+            path.append(child)
+        return path
+
+    def containing(self, rect):
+        """
+        Find indexed rectangles containing rect (rect itself included if
+        indexed). Any container is stored in a node on the path to where
+        rect would be stored, so only those nodes are visited.
+
+        Arguments:
+            rect (Rectangle): Query rectangle
+
+        Returns:
+            list: Rectangles containing rect
+        """
+        left, bottom = rect.x, rect.y
+        right, top = rect.x+rect.width, rect.y+rect.height
+
+        return [r for node in self._path(rect) for r in node.items.values()
+                if r.x <= left and r.y <= bottom and
+                r.x+r.width >= right and r.y+r.height >= top]
+
+    def within(self, rect):
+        """
+        Find indexed rectangles contained by rect (rect itself included if
+        indexed), they are stored in nodes on the path to where rect would
+        be stored or bellow the last one.
+
+        Arguments:
+            rect (Rectangle): Query rectangle
+
+        Returns:
+            list: Rectangles contained by rect
+        """
+        left, bottom = rect.x, rect.y
+        right, top = rect.x+rect.width, rect.y+rect.height
+
+        path = self._path(rect)
+        stack = path[-1:]
+        nodes = path[:-1]
+        while stack:
+            node = stack.pop()
+            nodes.append(node)
+            if node.children is None:
+                continue
+            for c in node.children:
+                if c is not None and c.x0 < right and c.x1 > left and \
+                        c.y0 < top and c.y1 > bottom:
+                    stack.append(c)
+
+        return [r for node in nodes for r in node.items.values()
+                if r.x >= left and r.y >= bottom and
+                r.x+r.width <= right and r.y+r.height <= top]
+
+    def clear(self):
+        root = self._root
+        self._root = _QuadNode(root.x0, root.y0, root.x1, root.y1, 0)
+        self._nodes = {}
+
+
+
+class SizeIndex(object):
+    """Index rectangles by width and by height, to find the ones big enough
+    to contain a given size without testing all of them. Each query scans
+    whichever of the two sorted lists has fewer candidates left. The largest
+    width, height and area are also available in constant time.
+
+    Rectangles are tracked by identity, they must not be resized while they
+    are stored in the index.
+    """
+
+    def __init__(self):
+        self._widths = []   # Sorted widths
+        self._wrects = []   # Rectangles in the same order as _widths
+        self._heights = []
+        self._hrects = []
+        self._areas = []    # Sorted areas
+
+    def __len__(self):
+        return len(self._wrects)
+
+    @staticmethod
+    def _insert(keys, rects, key, rect):
+        i = bisect.bisect_right(keys, key)
+        keys.insert(i, key)
+        rects.insert(i, rect)
+
+    @staticmethod
+    def _remove(keys, rects, key, rect):
+        i = bisect.bisect_left(keys, key)
+        while rects[i] is not rect:
+            i += 1
+        del keys[i]
+        del rects[i]
+
+    def add(self, rect):
+        """
+        Arguments:
+            rect (Rectangle): Rectangle to index
+        """
+        self._insert(self._widths, self._wrects, rect.width, rect)
+        self._insert(self._heights, self._hrects, rect.height, rect)
+        bisect.insort(self._areas, rect.width*rect.height)
+
+    def remove(self, rect):
+        """
+        Arguments:
+            rect (Rectangle): Previously indexed rectangle
+        """
+        self._remove(self._widths, self._wrects, rect.width, rect)
+        self._remove(self._heights, self._hrects, rect.height, rect)
+        del self._areas[bisect.bisect_left(self._areas, rect.width*rect.height)]
+
+    def max_width(self):
+        """Largest indexed width, 0 when empty"""
+        return self._widths[-1] if self._widths else 0
+
+    def max_height(self):
+        """Largest indexed height, 0 when empty"""
+        return self._heights[-1] if self._heights else 0
+
+    def max_area(self):
+        """Largest indexed area, 0 when empty"""
+        return self._areas[-1] if self._areas else 0
+
+    def containing(self, width, height):
+        """
+        Find indexed rectangles with enough width and height to contain
+        a rectangle of the given dimensions, in no particular order.
+
+        Arguments:
+            width (int, float): Rectangle width
+            height (int, float): Rectangle height
+
+        Returns:
+            list: Rectangles with width >= width and height >= height
+        """
+        w = bisect.bisect_left(self._widths, width)
+        h = bisect.bisect_left(self._heights, height)
+
+        if len(self._widths)-w <= len(self._heights)-h:
+            return [r for r in self._wrects[w:] if r.height >= height]
+        else:
+            return [r for r in self._hrects[h:] if r.width >= width]
+
+    def clear(self):
+        self.__init__()
+
+
+
+class ExactSizeIndex(object):
+    """Hash index from (width, height) to the rectangles with exactly
+    that size, used to find perfect fits without scanning.
+
+    Rectangles are tracked by identity, they must not be resized while they
+    are stored in the index.
+    """
+
+    def __init__(self):
+        self._rects = {}    # (width, height) -> {id(rect): rect}
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def add(self, rect):
+        """
+        Arguments:
+            rect (Rectangle): Rectangle to index
+        """
+        key = (rect.width, rect.height)
+        rects = self._rects.get(key)
+        if rects is None:
+            rects = self._rects[key] = {}
+        rects[id(rect)] = rect
+        self._len += 1
+
+    def remove(self, rect):
+        """
+        Arguments:
+            rect (Rectangle): Previously indexed rectangle
+        """
+        key = (rect.width, rect.height)
+        rects = self._rects[key]
+        del rects[id(rect)]
+        if not rects:
+            del self._rects[key]
+        self._len -= 1
+
+    def get(self, width, height):
+        """
+        Arguments:
+            width (int, float): Rectangle width
+            height (int, float): Rectangle height
+
+        Returns:
+            list: Rectangles of exactly width x height, in the order
+                they were added.
+        """
+        rects = self._rects.get((width, height))
+        return list(rects.values()) if rects else []
+
+    def clear(self):
+        self.__init__()
+
+
+
+class CapacityTree(object):
+    """Segment tree over a sequence of bins, each node stores the largest
+    free width, height and area (see PackingAlgorithm.capacity) of the bins
+    below it. Finds the first bin from a position where a rectangle may fit
+    in O(log n), skipping whole ranges of bins without enough room.
+    """
+
+    def __init__(self):
+        self._len = 0
+        self._size = 1  # Number of leaves, power of 2
+        self._nodes = [(0, 0, 0)]*2
+
+    def __len__(self):
+        return self._len
+
+    def append(self, capacity):
+        """
+        Arguments:
+            capacity (tuple): (width, height, area) of the new last bin
+        """
+        if self._len == self._size:
+            leaves = self._nodes[self._size:]
+            self._size *= 2
+            self._nodes = [(0, 0, 0)]*(2*self._size)
+            self._nodes[self._size:self._size+len(leaves)] = leaves
+            for i in range(self._size-1, 0, -1):
+                self._nodes[i] = self._combine(self._nodes[2*i], self._nodes[2*i+1])
+
+        self._len += 1
+        self.update(self._len-1, capacity)
+
+    @staticmethod
+    def _combine(a, b):
+        return max(a[0], b[0]), max(a[1], b[1]), max(a[2], b[2])
+
+    def update(self, position, capacity):
+        """
+        Arguments:
+            position (int): Bin position
+            capacity (tuple): New (width, height, area) for the bin
+        """
+        nodes = self._nodes
+        i = position+self._size
+        nodes[i] = tuple(capacity)
+        i //= 2
+        while i:
+            nodes[i] = self._combine(nodes[2*i], nodes[2*i+1])
+            i //= 2
+
+    @staticmethod
+    def _may_fit(capacity, width, height, rot):
+        max_width, max_height, max_area = capacity
+        if width*height > max_area:
+            return False
+        if width <= max_width and height <= max_height:
+            return True
+        return rot and height <= max_width and width <= max_height
+
+    def first(self, width, height, rot=True, start=0):
+        """
+        Find the first bin from start where the rectangle may fit, the same
+        test as PackingAlgorithm._may_fit.
+
+        Arguments:
+            width (int, float): Rectangle width
+            height (int, float): Rectangle height
+            rot (bool): Rectangle rotation enabled
+            start (int): First bin position tested
+
+        Returns:
+            int: Bin position
+            None: The rectangle doesn't fit in any bin from start
+        """
+        if start >= self._len:
+            return None
+
+        # Walk right from the start leaf, climbing to the next subtree 
+        # when a node has no room and descending when it may have.
+        # Combined maximums can come from different bins, so descending
+        # can also fail and continue to the right.
+        nodes, size = self._nodes, self._size
+        i = start+size
+        while True:
+            if self._may_fit(nodes[i], width, height, rot):
+                if i >= size:
+                    return i-size if i-size < self._len else None
+                i *= 2
+                continue
+
+            while i & 1:
+                i //= 2
+            if not i:
+                return None
+            i += 1
+
+    def clear(self):
+        self.__init__()
@@ -1,18 +1,138 @@
 from .pack_algo import PackingAlgorithm
 from .geometry import Rectangle
+from .index import QuadTree, SizeIndex, ExactSizeIndex
+import bisect
 import itertools
-import collections
 import operator
 
 
 first_item = operator.itemgetter(0)
+first_two = operator.itemgetter(0, 1)
+
+# Distance between the ranks of consecutive max_rects when they are numbered,
+# leaves room to insert the splits of many placements before renumbering
+# (at least 4, the most splits a max_rect can have).
+_RANK_GAP = 1 << 32
 
 
 
 class MaxRects(PackingAlgorithm):
 
+    # Set when a perfect fit always has a better fitness than any other
+    # placement, so it can be selected directly from the exact size index.
+    _exact_fit_first = False
+
     def __init__(self, width, height, rot=True, *args, **kwargs):
+        self._query = Rectangle(0, 0, 0, 0) # Reused for index queries
         super(MaxRects, self).__init__(width, height, rot, *args, **kwargs)
+
+    @property
+    def _max_rects(self):
+        """
+        List of maximal rectangles, kept in sync with the spatial index
+        used to find the ones intersecting a placed rectangle, and the size
+        index used to find the ones big enough for a new rectangle, and
+        the exact size index used to find perfect fits.
+        """
+        return self._free_rects
+
+    @_max_rects.setter
+    def _max_rects(self, max_rects):
+        if self._listeners:
+            for m in self._free_rects:
+                for listener in self._listeners:
+                    listener.region_removed(self, m)
+
+        self._free_rects = list(max_rects)
+        self._renumber()
+        self._free_index = QuadTree(0, 0, self.width, self.height)
+        self._size_index = SizeIndex()
+        self._exact_index = ExactSizeIndex()
+        for m in self._free_rects:
+            self._index_max_rect(m)
+
+    def _renumber(self):
+        """
+        Assign evenly spaced ranks to the max_rects in list order. Ranks
+        grow along _max_rects, so they compare the same as list positions
+        and a position is found bisecting _free_ranks, while the splits of
+        a max_rect take ranks between its own and the next one.
+        """
+        self._free_ranks = list(range(0, len(self._free_rects)*_RANK_GAP, _RANK_GAP))
+        self._free_order = dict(zip(map(id, self._free_rects), self._free_ranks))
+
+    def _index_max_rect(self, m):
+        self._free_index.add(m)
+        self._size_index.add(m)
+        self._exact_index.add(m)
+        self._version += 1
+        for listener in self._listeners:
+            listener.region_added(self, m)
+
+    def _unindex_max_rect(self, m):
+        self._free_index.remove(m)
+        self._size_index.remove(m)
+        self._exact_index.remove(m)
+        self._version += 1
+        for listener in self._listeners:
+            listener.region_removed(self, m)
+
+    def _max_rects_order(self):
+        """
+        Returns:
+            dict: id(max_rect) -> rank, ordered as the positions in _max_rects
+        """
+        return self._free_order
+
+    def _position(self, m):
+        """
+        Returns:
+            int: Position of max_rect m in _max_rects
+        """
+        return bisect.bisect_left(self._free_ranks, self._free_order[id(m)])
+
+    def _candidates(self, w, h):
+        """
+        Generator for the max_rects where a rectangle fits, in both
+        orientations if rotation is enabled. Only max_rects big enough
+        are visited, in no particular order, so each one comes with a
+        key ordered as a scan of _max_rects (normal orientation first) to
+        break fitness ties the same way.
+
+        Arguments:
+            w (int, float): Rectangle width
+            h (int, float): Rectangle height
+
+        Returns:
+            generator: (position, w, h, max_rect)
+        """
+        order = self._max_rects_order()
+        for m in self._size_index.containing(w, h):
+            yield order[id(m)], w, h, m
+
+        if self.rot and self._free_ranks:
+            rotated = self._free_ranks[-1]+1
+            for m in self._size_index.containing(h, w):
+                yield rotated+order[id(m)], h, w, m
+
+    def _exact_fit(self, w, h):
+        """
+        Find the first max_rect of exactly w*h (or h*w if rotation is
+        enabled), the same one a full scan would select when perfect fits
+        have the best fitness.
+
+        Returns:
+            (rect, max_rect): or (None, None) if there is no perfect fit
+        """
+        orientations = [(w, h), (h, w)] if self.rot else [(w, h)]
+        for w, h in orientations:
+            exact = self._exact_index.get(w, h)
+            if exact:
+                order = self._max_rects_order()
+                m = min(exact, key=lambda m: order[id(m)])
+                return Rectangle(m.x, m.y, w, h), m
+
+        return None, None
    
     def _rect_fitness(self, max_rect, width, height):
         """
@@ -47,21 +167,18 @@ class MaxRects(PackingAlgorithm):
         if not self._max_rects:
             return None, None
 
-        # Normal rectangle
-        fitn = ((self._rect_fitness(m, w, h), w, h, m) for m in self._max_rects 
-                if self._rect_fitness(m, w, h) is not None)
-
-        # Rotated rectangle
-        fitr = ((self._rect_fitness(m, h, w), h, w, m) for m in self._max_rects 
-                if self._rect_fitness(m, h, w) is not None)
+        if self._exact_fit_first:
+            rect, m = self._exact_fit(w, h)
+            if rect is not None:
+                return rect, m
 
-        if not self.rot:
-            fitr = []
-
-        fit = itertools.chain(fitn, fitr)
+        # Normal and rotated rectangle
+        fit = ((self._rect_fitness(m, w, h), pos, w, h, m) 
+                for pos, w, h, m in self._candidates(w, h))
+        fit = (f for f in fit if f[0] is not None)
         
         try:
-            _, w, h, m = min(fit, key=first_item)
+            _, _, w, h, m = min(fit, key=first_two)
         except ValueError:
             return None, None
 
@@ -78,42 +195,139 @@ class MaxRects(PackingAlgorithm):
             r (Rectangle): rectangle placed
 
         Returns:
-            list : list containing new maximal rectangles or an empty list
+            list : (x, y, width, height) of the new maximal rectangles, 
+                an empty list if there are none
         """
         new_rects = []
         
         if r.left > m.left:
-            new_rects.append(Rectangle(m.left, m.bottom, r.left-m.left, m.height))
+            new_rects.append((m.left, m.bottom, r.left-m.left, m.height))
         if r.right < m.right:
-            new_rects.append(Rectangle(r.right, m.bottom, m.right-r.right, m.height))
+            new_rects.append((r.right, m.bottom, m.right-r.right, m.height))
         if r.top < m.top:
-            new_rects.append(Rectangle(m.left, r.top, m.width, m.top-r.top))
+            new_rects.append((m.left, r.top, m.width, m.top-r.top))
         if r.bottom > m.bottom:
-            new_rects.append(Rectangle(m.left, m.bottom, m.width, r.bottom-m.bottom))
+            new_rects.append((m.left, m.bottom, m.width, r.bottom-m.bottom))
         
         return new_rects
 
+    def _contained_splits(self, splits):
+        """
+        Find the splits contained by another split or by one of the
+        max_rects in the spatial index. The max_rects were already pruned
+        and every split lies inside the max_rect it was generated from, so
+        a split can't contain any of them.
+
+        Arguments:
+            splits (list): (x, y, width, height) of every split
+
+        Returns:
+            set: Positions in splits of the contained ones
+        """
+        contained = set()
+        for i, (x, y, w, h) in enumerate(splits):
+            for j, (ox, oy, ow, oh) in enumerate(splits):
+                if i != j and ox <= x and oy <= y and \
+                        ox+ow >= x+w and oy+oh >= y+h:
+                    contained.add(i)
+                    break
+
+        # Reuse the same rectangle to query the spatial index
+        query = self._query
+        for i, split in enumerate(splits):
+            if i in contained:
+                continue
+            query.x, query.y, query.width, query.height = split
+            if self._free_index.containing(query):
+                contained.add(i)
+        
+        return contained
+
+    def _rank_gap(self, i):
+        """
+        Returns:
+            int: Ranks available from the one of the max_rect at position i
+                to the next max_rect.
+        """
+        ranks = self._free_ranks
+        if i+1 < len(ranks):
+            return ranks[i+1]-ranks[i]
+        return _RANK_GAP
+
     def _split(self, rect):
         """
         Split all max_rects intersecting the rectangle rect into up to
-        4 new max_rects.
+        4 new max_rects. Each max_rect is replaced by its splits in place,
+        and the splits contained by another max_rect are discarded before
+        creating them, so the max_rects stay pruned.
         
         Arguments:
             rect (Rectangle): Rectangle
 
         Returns:
-            split (Rectangle list): List of rectangles resulting from the split
+            split (Rectangle list): New max_rects resulting from the split
         """
-        max_rects = collections.deque()
+        # Only visit the max_rects the spatial index reports as intersecting
+        intersecting = self._free_index.intersecting(rect)
+        if not intersecting:
+            return []
+
+        max_rects, ranks = self._free_rects, self._free_ranks
+        positions = sorted(map(self._position, intersecting))
+        for m in intersecting:
+            self._unindex_max_rect(m)
+
+        groups = [self._generate_splits(max_rects[i], rect) for i in positions]
+        splits = [s for group in groups for s in group]
+        contained = self._contained_splits(splits)
+
+        # Replace each max_rect with its splits, starting from the end so
+        # the positions still pending don't shift. The splits take ranks
+        # between the max_rect and the next one.
+        new_rects = []
+        end = len(splits)
+        for i, group in zip(reversed(positions), reversed(groups)):
+            start = end-len(group)
+            rects = [Rectangle(*splits[j]) for j in range(start, end) 
+                    if j not in contained]
+            end = start
+
+            gap = self._rank_gap(i)
+            if gap < len(rects):
+                self._renumber()
+                gap = self._rank_gap(i)
+            ranks = self._free_ranks
+            step = gap//max(len(rects), 1)
+            rect_ranks = [ranks[i]+k*step for k in range(len(rects))]
+
+            del self._free_order[id(max_rects[i])]
+            self._free_order.update(zip(map(id, rects), rect_ranks))
+            max_rects[i:i+1] = rects
+            ranks[i:i+1] = rect_ranks
+            new_rects.append(rects)
+
+        new_rects = [m for rects in reversed(new_rects) for m in rects]
+        for m in new_rects:
+            self._index_max_rect(m)
+        return new_rects
 
-        for r in self._max_rects:
-            if r.intersects(rect):
-                max_rects.extend(self._generate_splits(r, rect))
-            else:
-                max_rects.append(r)
+    def _compact(self, removed):
+        """
+        Remove max_rects from the list in place, preserving the order of
+        the remaining ones.
+
+        Arguments:
+            removed (list): max_rects to remove
+        """
+        positions = sorted(map(self._position, removed))
+        for i in positions:
+            self._unindex_max_rect(self._free_rects[i])
 
-        # Add newly generated max_rects
-        self._max_rects = list(max_rects)
+        # Delete from the end so the pending positions don't shift
+        for i in reversed(positions):
+            del self._free_order[id(self._free_rects[i])]
+            del self._free_rects[i]
+            del self._free_ranks[i]
 
     def _remove_duplicates(self):
         """
@@ -127,7 +341,30 @@ class MaxRects(PackingAlgorithm):
                 contained.add(m1)
         
         # Remove from max_rects
-        self._max_rects = [m for m in self._max_rects if m not in contained]
+        if contained:
+            self._compact([m for m in self._max_rects if m in contained])
+
+    def capacity(self):
+        index = self._size_index
+        return index.max_width(), index.max_height(), index.max_area()
+
+    def _free_regions(self):
+        return self._max_rects
+
+    def _region_fitness(self, max_rect, width, height):
+        fitness = self._rect_fitness(max_rect, width, height)
+        if self.rot:
+            rotated = self._rect_fitness(max_rect, height, width)
+            if fitness is None or (rotated is not None and rotated < fitness):
+                fitness = rotated
+        return fitness
+
+    def fitness_many(self, sizes):
+        """
+        Fitness for several rectangles at once, scored in a single pass
+        over the free max_rects (see PackingAlgorithm._fitness_many_by_region).
+        """
+        return self._fitness_many_by_region(sizes)
 
     def fitness(self, width, height): 
         """
@@ -144,8 +381,11 @@ class MaxRects(PackingAlgorithm):
             None: Rectangle can't be placed
         """
         assert(width > 0 and height > 0)
+        if not self._may_fit(width, height):
+            return None
         
-        rect, max_rect = self._select_position(width, height)
+        rect, max_rect = self._cache_placement(width, height,
+                self._select_position(width, height))
         if rect is None:
             return None
 
@@ -166,18 +406,22 @@ class MaxRects(PackingAlgorithm):
             None: If the rectangle couldn be placed.
         """
         assert(width > 0 and height >0)
+        if not self._may_fit(width, height):
+            return None
 
-        # Search best position and orientation
-        rect, _ = self._select_position(width, height)
+        # Search best position and orientation, unless fitness() already
+        # did it for this rectangle.
+        placement = self._cached_placement(width, height)
+        if placement is None:
+            placement = self._select_position(width, height)
+
+        rect, _ = placement
         if not rect:
             return None
         
         # Subdivide all the max rectangles intersecting with the selected 
-        # rectangle.
+        # rectangle, splits contained by another max_rect are discarded.
         self._split(rect)
-    
-        # Remove any max_rect contained by another 
-        self._remove_duplicates()
 
         # Store and return rectangle position.
         rect.rid = rid
@@ -187,12 +431,9 @@ class MaxRects(PackingAlgorithm):
     def place_rect(self, width, height, x, y, rid=None):
         rect = Rectangle(x=x, y=y, width=width, height=height, rid=rid)
         # Subdivide all the max rectangles intersecting with the selected
-        # rectangle.
+        # rectangle, splits contained by another max_rect are discarded.
         self._split(rect)
 
-        # Remove any max_rect contained by another
-        self._remove_duplicates()
-
         # Store and return rectangle position.
         rect.rid = rid
         self.rectangles.append(rect)
@@ -248,18 +489,10 @@ class MaxRectsBl(MaxRects):
         is lower, if there are severtal pick the one with the smallest x 
         coordinate
         """
-        fitn = ((m.y+h, m.x, w, h, m) for m in self._max_rects 
-                if self._rect_fitness(m, w, h) is not None)
-        fitr = ((m.y+w, m.x, h, w, m) for m in self._max_rects 
-                if self._rect_fitness(m, h, w) is not None)
-
-        if not self.rot:
-            fitr = []
-
-        fit = itertools.chain(fitn, fitr)
+        fit = ((m.y+h, pos, w, h, m) for pos, w, h, m in self._candidates(w, h))
         
         try:
-            _, _, w, h, m = min(fit, key=first_item)
+            _, _, w, h, m = min(fit, key=first_two)
         except ValueError:
             return None, None
 
@@ -277,6 +510,8 @@ class MaxRectsBssf(MaxRects):
 class MaxRectsBaf(MaxRects):
     """Best Area Fit pick maximal rectangle with smallest area
     where the rectangle can be placed"""
+    _exact_fit_first = True
+
     def _rect_fitness(self, max_rect, width, height):
         if width > max_rect.width or height > max_rect.height:
             return None
@@ -286,6 +521,8 @@ class MaxRectsBaf(MaxRects):
 
 class MaxRectsBlsf(MaxRects):
     """Best Long Side Fit minimize long leftover side"""
+    _exact_fit_first = True
+
     def _rect_fitness(self, max_rect, width, height):
         if width > max_rect.width or height > max_rect.height:
             return None
@@ -0,0 +1,295 @@
+import numpy as np
+
+from .geometry import Rectangle
+from .np_utils import CoordinateArrays
+from .maxrects import MaxRects, MaxRectsBl, MaxRectsBssf, MaxRectsBaf, \
+    MaxRectsBlsf
+
+
+class MaxRectsNp(CoordinateArrays, MaxRects):
+    """MaxRects variant storing the maximal rectangles in parallel NumPy
+    arrays (x, y, width, height) instead of Rectangle objects. Fitness of
+    every max_rect for both orientations is computed in one vectorized pass,
+    and splits and pruning are done with masked array operations.
+
+    The arrays are kept in the same order as MaxRects._max_rects so both
+    backends return the same placements. Coordinates are stored as int64
+    when the surface and rectangle dimensions are integers, float64 otherwise.
+    """
+
+    _arrays = ('_mx', '_my', '_mw', '_mh')
+
+    def _fitness_array(self, mw, mh, width, height):
+        """
+        Vectorized _rect_fitness, only called for the max_rects where the
+        rectangle fits.
+
+        Arguments:
+            mw (numpy.ndarray): max_rects width
+            mh (numpy.ndarray): max_rects height
+            width (int, float, numpy.ndarray): Rectangle width
+            height (int, float, numpy.ndarray): Rectangle height
+
+        Returns:
+            numpy.ndarray: Fitness of each max_rect
+        """
+        return np.zeros_like(mw-width)
+
+    def _position_array(self, mx, my, mw, mh, width, height):
+        """
+        Value minimized to select the max_rect where the rectangle is placed,
+        by default the same as the fitness.
+        """
+        return self._fitness_array(mw, mh, width, height)
+
+    @property
+    def _max_rects(self):
+        return [Rectangle(*m) for m in zip(self._mx.tolist(), self._my.tolist(),
+            self._mw.tolist(), self._mh.tolist())]
+
+    @_max_rects.setter
+    def _max_rects(self, max_rects):
+        max_rects = list(max_rects)
+        values = [v for m in max_rects for v in (m.x, m.y, m.width, m.height)]
+        dtype = self._dtype(*values)
+
+        self._mx = np.array([m.x for m in max_rects], dtype=dtype)
+        self._my = np.array([m.y for m in max_rects], dtype=dtype)
+        self._mw = np.array([m.width for m in max_rects], dtype=dtype)
+        self._mh = np.array([m.height for m in max_rects], dtype=dtype)
+        self._version += 1
+
+    def capacity(self):
+        if not len(self._mx):
+            return 0, 0, 0
+        return (self._mw.max().item(), self._mh.max().item(),
+            (self._mw*self._mh).max().item())
+
+    def _free_regions(self):
+        # max_rects aren't objects, changes can't be reported by region
+        return None
+
+    def _candidates(self, w, h):
+        """
+        Returns:
+            (index, rotated, score) arrays for every max_rect and orientation
+            where the rectangle fits, normal orientation first.
+        """
+        mx, my, mw, mh = self._mx, self._my, self._mw, self._mh
+
+        fitn = np.flatnonzero((mw >= w) & (mh >= h))
+        if self.rot:
+            fitr = np.flatnonzero((mw >= h) & (mh >= w))
+        else:
+            fitr = fitn[:0]
+
+        index = np.concatenate((fitn, fitr))
+        rotated = np.zeros(len(index), dtype=bool)
+        rotated[len(fitn):] = True
+        score = np.concatenate((
+            self._position_array(mx[fitn], my[fitn], mw[fitn], mh[fitn], w, h),
+            self._position_array(mx[fitr], my[fitr], mw[fitr], mh[fitr], h, w)))
+        return index, rotated, score
+
+    def _select_position(self, w, h):
+        """
+        Find max_rect with best fitness for placing a rectangle
+        of dimentsions w*h, see MaxRects._select_position
+        """
+        if not len(self._mx):
+            return None, None
+
+        index, rotated, score = self._candidates(w, h)
+        if not len(index):
+            return None, None
+
+        # argmin returns the first minimum, same as min() in MaxRects
+        best = np.argmin(score)
+        i = index[best]
+        if rotated[best]:
+            w, h = h, w
+
+        m = Rectangle(self._mx[i].item(), self._my[i].item(),
+                self._mw[i].item(), self._mh[i].item())
+        return Rectangle(m.x, m.y, w, h), m
+
+    def fitness_many(self, sizes):
+        """
+        Fitness for several rectangles at once, all max_rects are scored for
+        every size and orientation with a single set of array operations.
+        """
+        sizes = np.asarray(list(sizes)).reshape(-1, 2)
+        if not len(sizes) or not len(self._mx):
+            return [None]*len(sizes)
+
+        self._promote(*sizes.ravel().tolist())
+        result = []
+        # Chunked to bound the size of the (sizes, max_rects) matrices
+        for start in range(0, len(sizes), 256):
+            result.extend(self._fitness_chunk(sizes[start:start+256]))
+        return result
+
+    def _fitness_chunk(self, sizes):
+        mx, my = self._mx[None, :], self._my[None, :]
+        mw, mh = self._mw[None, :], self._mh[None, :]
+        w, h = sizes[:, 0, None], sizes[:, 1, None]
+
+        orientations = [(w, h)]
+        if self.rot:
+            orientations.append((h, w))
+
+        # Position score where the rectangle fits, inf where it doesn't,
+        # normal orientation first so argmin breaks ties like MaxRects.
+        score = np.hstack([np.where((mw >= rw) & (mh >= rh),
+            self._position_array(mx, my, mw, mh, rw, rh), np.inf)
+            for rw, rh in orientations])
+        best = np.argmin(score, axis=1)
+        rows = np.arange(len(sizes))
+        fits = np.isfinite(score[rows, best])
+
+        n = len(self._mx)
+        index, rotated = best % n, best >= n
+        rw = np.where(rotated, h[:, 0], w[:, 0])
+        rh = np.where(rotated, w[:, 0], h[:, 0])
+        fitness = self._fitness_array(self._mw[index], self._mh[index], rw, rh)
+        return [f if ok else None for f, ok in zip(fitness.tolist(), fits)]
+
+    def _split(self, rect):
+        """
+        Split all max_rects intersecting the rectangle rect into up to
+        4 new max_rects, each split replaces its max_rect in the arrays.
+        Splits contained by another max_rect are removed afterwards.
+
+        Arguments:
+            rect (Rectangle): Rectangle
+        """
+        self._promote(rect.x, rect.y, rect.width, rect.height)
+        mx, my, mw, mh = self._mx, self._my, self._mw, self._mh
+        left, bottom = rect.x, rect.y
+        right, top = rect.x+rect.width, rect.y+rect.height
+        mright, mtop = mx+mw, my+mh
+
+        hit = (mx < right) & (mright > left) & (my < top) & (mtop > bottom)
+        if not hit.any():
+            return
+        self._version += 1
+
+        # Each max_rect expands to 4 slots (left, right, top, bottom splits),
+        # max_rects not intersecting keep only the first one.
+        n = len(mx)
+        sx = np.repeat(mx, 4).reshape(n, 4)
+        sy = np.repeat(my, 4).reshape(n, 4)
+        sw = np.repeat(mw, 4).reshape(n, 4)
+        sh = np.repeat(mh, 4).reshape(n, 4)
+
+        valid = np.zeros((n, 4), dtype=bool)
+        valid[:, 0] = ~hit
+
+        # Left
+        valid[:, 0] |= hit & (left > mx)
+        sw[:, 0] = np.where(hit, left-mx, mw)
+        # Right
+        valid[:, 1] = hit & (right < mright)
+        sx[:, 1] = right
+        sw[:, 1] = mright-right
+        # Top
+        valid[:, 2] = hit & (top < mtop)
+        sy[:, 2] = top
+        sh[:, 2] = mtop-top
+        # Bottom
+        valid[:, 3] = hit & (bottom > my)
+        sh[:, 3] = bottom-my
+
+        valid = valid.ravel()
+        new = (np.repeat(hit, 4) & valid)[valid]
+
+        self._mx = sx.ravel()[valid]
+        self._my = sy.ravel()[valid]
+        self._mw = sw.ravel()[valid]
+        self._mh = sh.ravel()[valid]
+        self._remove_contained(np.flatnonzero(new))
+
+    def _contained(self, inner, outer):
+        """
+        Returns:
+            numpy.ndarray: Boolean matrix, [i, j] True when max_rect inner[i]
+                is contained by max_rect outer[j]
+        """
+        mx, my, mw, mh = self._mx, self._my, self._mw, self._mh
+        ix, iy = mx[inner, None], my[inner, None]
+        ox, oy = mx[None, outer], my[None, outer]
+        return (ix >= ox) & (iy >= oy) & \
+            (ix+mw[inner, None] <= ox+mw[None, outer]) & \
+            (iy+mh[inner, None] <= oy+mh[None, outer])
+
+    def _remove_contained(self, new_rects):
+        """
+        Remove max_rects contained by another, only testing the ones
+        generated by the last split, see MaxRects._remove_contained.
+
+        Arguments:
+            new_rects (numpy.ndarray): Positions of the new max_rects
+        """
+        if not len(new_rects):
+            return
+
+        everything = np.arange(len(self._mx))
+        inside = self._contained(new_rects, everything)
+        inside[np.arange(len(new_rects)), new_rects] = False  # Itself
+
+        outside = self._contained(everything, new_rects)
+        outside[new_rects, np.arange(len(new_rects))] = False
+
+        contained = outside.any(axis=1)
+        contained[new_rects] |= inside.any(axis=1)
+        self._keep(~contained)
+
+    def _remove_duplicates(self):
+        """
+        Remove every maximal rectangle contained by another one.
+        """
+        everything = np.arange(len(self._mx))
+        inside = self._contained(everything, everything)
+        np.fill_diagonal(inside, False)
+        self._keep(~inside.any(axis=1))
+
+    def _keep(self, mask):
+        if mask.all():
+            return
+        self._mx = self._mx[mask]
+        self._my = self._my[mask]
+        self._mw = self._mw[mask]
+        self._mh = self._mh[mask]
+
+    def add_rect(self, width, height, rid=None):
+        self._promote(width, height)
+        return super(MaxRectsNp, self).add_rect(width, height, rid)
+
+    def place_rect(self, width, height, x, y, rid=None):
+        self._promote(width, height, x, y)
+        return super(MaxRectsNp, self).place_rect(width, height, x, y, rid)
+
+
+
+class MaxRectsBlNp(MaxRectsNp, MaxRectsBl):
+    """Vectorized MaxRectsBl"""
+    def _position_array(self, mx, my, mw, mh, width, height):
+        return my+height
+
+
+class MaxRectsBssfNp(MaxRectsNp, MaxRectsBssf):
+    """Vectorized MaxRectsBssf"""
+    def _fitness_array(self, mw, mh, width, height):
+        return np.minimum(mw-width, mh-height)
+
+
+class MaxRectsBafNp(MaxRectsNp, MaxRectsBaf):
+    """Vectorized MaxRectsBaf"""
+    def _fitness_array(self, mw, mh, width, height):
+        return mw*mh-width*height
+
+
+class MaxRectsBlsfNp(MaxRectsNp, MaxRectsBlsf):
+    """Vectorized MaxRectsBlsf"""
+    def _fitness_array(self, mw, mh, width, height):
+        return np.maximum(mw-width, mh-height)
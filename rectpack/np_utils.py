@@ -0,0 +1,37 @@
+import numbers
+
+import numpy as np
+
+
+def is_integral(*values):
+    """
+    Returns:
+        bool: True if all the values are integers
+    """
+    return all(isinstance(v, numbers.Integral) for v in values)
+
+
+class CoordinateArrays(object):
+    """Mixin for the backends storing rectangles in parallel NumPy arrays,
+    the attribute names of the arrays are listed in _arrays. Coordinates
+    are stored as int64 while the surface and every rectangle are integers,
+    and as float64 from the first non-integer value.
+    """
+
+    _arrays = ()
+
+    def _dtype(self, *values):
+        """
+        Returns:
+            numpy.dtype: Array type for the surface and the given values
+        """
+        if is_integral(self.width, self.height, *values):
+            return np.int64
+        return np.float64
+
+    def _promote(self, *values):
+        """Switch arrays to float64 when a non-integer value is used"""
+        if getattr(self, self._arrays[0]).dtype != np.float64 and \
+                not is_integral(*values):
+            for name in self._arrays:
+                setattr(self, name, getattr(self, name).astype(np.float64))
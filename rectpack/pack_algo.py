@@ -1,4 +1,5 @@
 from .geometry import Rectangle
+import bisect
 
 
 class PackingAlgorithm(object):
@@ -20,6 +21,9 @@ class PackingAlgorithm(object):
         self.rectangles = []
         self.bid = bid
         self._surface = Rectangle(0, 0, width, height)
+        self._listeners = []
+        self._version = 0       # Incremented every time free space changes
+        self._placement = None  # Last placement found by fitness()
         self.reset()
 
     def __len__(self):
@@ -54,6 +58,36 @@ class PackingAlgorithm(object):
         """
         return self.rectangles[key]
 
+    def capacity(self):
+        """
+        Upper bounds for the free space left, any rectangle that can still 
+        be placed is at most this wide, tall and big. Algorithms keep them 
+        updated as rectangles are placed, so they are cheap to query.
+
+        Returns:
+            (width, height, area): Largest free width, height and area
+        """
+        return self.width, self.height, self.width*self.height
+
+    def _may_fit(self, width, height):
+        """
+        Test the rectangle is within capacity(), when it returns False the
+        rectangle can't be placed, when True it may be.
+
+        Arguments:
+            width (int, float): Rectangle width
+            height (int, float): Rectangle height
+
+        Returns:
+            boolean: False if the rectangle certainly doesn't fit
+        """
+        max_width, max_height, max_area = self.capacity()
+        if width*height > max_area:
+            return False
+        if width <= max_width and height <= max_height:
+            return True
+        return self.rot and height <= max_width and width <= max_height
+
     def used_area(self):
         """
         Total area of rectangles placed
@@ -79,7 +113,159 @@ class PackingAlgorithm(object):
             None: Rectangle can't be placed
         """
         raise NotImplementedError
+
+    def _cache_placement(self, width, height, placement):
+        """
+        Store the placement found by fitness() for a rectangle, so an 
+        add_rect() call for the same size can reuse it while the free space
+        stays the same (_version isn't changed).
+
+        Arguments:
+            width (int, float): Rectangle width
+            height (int, float): Rectangle height
+            placement: Result of the algorithm position search
+
+        Returns:
+            placement
+        """
+        self._placement = (self._version, width, height, placement)
+        return placement
+
+    def _cached_placement(self, width, height):
+        """
+        Returns:
+            Placement stored by _cache_placement for this rectangle size, 
+            None if there isn't one or the free space has changed since.
+        """
+        cached = self._placement
+        if cached is None or cached[0] != self._version or \
+                cached[1] != width or cached[2] != height:
+            return None
+        return cached[3]
+
+    def fitness_many(self, sizes):
+        """
+        Fitness for several rectangles at once, the same as calling fitness
+        for each one. Repeated sizes (or rotated ones when rotation is 
+        enabled) are only evaluated once.
+
+        Arguments:
+            sizes (iterable): Rectangle sizes [(width, height), ...]
+
+        Returns:
+            list: Fitness for each size, None where it can't be placed
+        """
+        fitness = {}
+        result = []
+        for width, height in sizes:
+            key = (width, height)
+            if self.rot and width > height:
+                key = (height, width)
+
+            if key not in fitness:
+                fitness[key] = self.fitness(width, height)
+            result.append(fitness[key])
+
+        return result
+
+    def _fitness_many_by_region(self, sizes):
+        """
+        fitness_many for algorithms where fitness is the best _region_fitness
+        over _free_regions(). The free regions are visited once, each one is
+        only scored for the distinct sizes narrow enough to fit into it.
+
+        Arguments:
+            sizes (iterable): Rectangle sizes [(width, height), ...]
+
+        Returns:
+            list: Fitness for each size, None where it can't be placed
+        """
+        regions = self._free_regions()
+        if regions is None:
+            return PackingAlgorithm.fitness_many(self, sizes)
+
+        # With rotation sizes are stored short side first, a rectangle only
+        # fits into regions where its short side fits along the short side. 
+        keys = []
+        for width, height in sizes:
+            assert(width > 0 and height > 0)
+            if self.rot and width > height:
+                width, height = height, width
+            keys.append((width, height))
+
+        best = self._best_regions(sorted(set(keys)))
+        return [best[k][0] for k in keys]
+
+    def _best_regions(self, keys, regions=None):
+        """
+        Free region with the best fitness for several rectangle sizes, found
+        in a single pass over the regions. Each region is only scored for 
+        the sizes narrow enough to fit into it.
+
+        Arguments:
+            keys (list): Distinct sizes sorted, short side first when 
+                rotation is enabled
+            regions (iterable): Regions to score, _free_regions() when None
+
+        Returns:
+            dict: {size: (fitness, region)} with (None, None) for the sizes 
+                that can't be placed
+        """
+        if regions is None:
+            regions = self._free_regions()
+
+        firsts = [k[0] for k in keys]
+        best = dict.fromkeys(keys, (None, None))
+
+        region_fitness = self._region_fitness
+        for region in regions:
+            limit = region.width
+            if self.rot:
+                limit = min(region.width, region.height)
+
+            for key in keys[:bisect.bisect_right(firsts, limit)]:
+                fitness = region_fitness(region, key[0], key[1])
+                if fitness is not None and \
+                        (best[key][0] is None or fitness < best[key][0]):
+                    best[key] = (fitness, region)
+
+        return best
         
+    def _free_regions(self):
+        """
+        Algorithms where fitness is the minimum of _region_fitness over a 
+        set of independent free regions (MaxRects max_rects, Guillotine 
+        sections) return them here, and report every region added or 
+        removed to the subscribed listeners. 
+
+        Returns:
+            list: Free regions
+            None: Fitness can't be decomposed by region
+        """
+        return None
+
+    def _region_fitness(self, region, width, height):
+        """
+        Fitness of a rectangle placed into one of the free regions, in
+        any of the allowed orientations.
+
+        Returns:
+            int, float: Rectangle fitness 
+            None: Rectangle can't be placed into the region
+        """
+        raise NotImplementedError
+
+    def subscribe(self, listener):
+        """
+        Register an object to be notified of free region changes, it must
+        implement region_added(bin, region) and region_removed(bin, region).
+        Only algorithms where _free_regions isn't None send notifications.
+        """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self._listeners.remove(listener)
+
     def add_rect(self, width, height, rid=None):
         """
         Add rectangle of widthxheight dimensions.
@@ -135,6 +321,7 @@ class PackingAlgorithm(object):
 
     def reset(self):
         self.rectangles = []    # List of placed Rectangles.
+        self._version += 1
 
 
 
@@ -1,8 +1,12 @@
 from .maxrects import MaxRectsBssf
+from .index import CapacityTree, SizeIndex
 
 import operator
 import itertools
 import collections
+import heapq
+import bisect
+import array
 
 import decimal
 
@@ -25,6 +29,116 @@ def float2dec(ft, decimal_digits):
         return decimal.Decimal.from_float(float(ft)).quantize(places)
 
 
+def _compact(values):
+    """
+    Convert a sequence of numbers to the most compact container that keeps
+    their value and type.
+
+    Arguments:
+        values: NumPy array, array.array, buffer or iterable
+
+    Returns:
+        array.array: 'q' for integers, 'd' for floats
+        list: Any other values (Decimal, mixed types, ...)
+
+    Raises:
+        ValueError: values is a buffer or array with more than one dimension
+    """
+    if isinstance(values, array.array) and values.typecode in 'qd':
+        return array.array(values.typecode, values)
+
+    try:
+        view = memoryview(values)
+    except TypeError:
+        view = None
+
+    ndim = getattr(values, 'ndim', 1) if view is None else view.ndim
+    if ndim != 1:
+        raise ValueError("Columns must be one dimensional")
+
+    if view is not None and view.format in tuple('bBhHiIlLqQfd'):
+        values = view.tolist()
+    elif hasattr(values, 'tolist'):
+        values = values.tolist()
+    else:
+        values = list(values)
+
+    for kind, typecode in ((int, 'q'), (float, 'd')):
+        if all(type(v) is kind for v in values):
+            try:
+                return array.array(typecode, values)
+            except OverflowError:
+                break
+    return values
+
+
+class _Columns(object):
+    """
+    Append only table stored by column, numeric columns are kept in
+    array.array while all the values have the same type. Rows appended one
+    at a time are moved to the columns the next time the table is read or
+    extended. Iterating yields each row as a tuple.
+    """
+
+    def __init__(self, fields, defaults=None):
+        """
+        Arguments:
+            fields (int): Number of fields in each row
+            defaults (tuple): Value of each field when its column isn't 
+                given to extend, None for all of them when not provided
+        """
+        self._columns = [array.array('q') for _ in range(fields)]
+        self._defaults = defaults or (None,)*fields
+        self._rows = []
+
+    def __len__(self):
+        return len(self._columns[0])+len(self._rows)
+
+    def __iter__(self):
+        self._flush()
+        return zip(*self._columns)
+
+    def _flush(self):
+        if self._rows:
+            rows, self._rows = self._rows, []
+            self._extend([_compact(c) for c in zip(*rows)])
+
+    def _extend(self, columns):
+        for i, values in enumerate(columns):
+            column = self._columns[i]
+            if not len(values):
+                continue
+            if not len(column):
+                self._columns[i] = values
+            elif isinstance(column, array.array) and \
+                    getattr(values, 'typecode', None) == column.typecode:
+                column.extend(values)
+            else:
+                if isinstance(column, array.array):
+                    self._columns[i] = column = column.tolist()
+                column.extend(values)
+
+    def append(self, row):
+        self._rows.append(tuple(row))
+
+    def extend(self, *columns):
+        """
+        Arguments:
+            *columns: One sequence of values for each field, all with the
+                same length. Fields with a None column take their default.
+        """
+        columns = [c if c is None else _compact(c) for c in columns]
+        lengths = set(len(c) for c in columns if c is not None)
+        if len(lengths) > 1:
+            raise ValueError("Columns must have the same length")
+
+        size = lengths.pop() if lengths else 0
+        columns = [_compact([default]*size) if c is None else c
+                for c, default in zip(columns, self._defaults)]
+        self._flush()
+        self._extend(columns)
+
+
 # Sorting algos for rectangle lists
 SORT_AREA  = lambda rectlist: sorted(rectlist, reverse=True, 
         key=lambda r: r[0]*r[1]) # Sort by area
@@ -105,48 +219,112 @@ class PackerBNFMixin(object):
     doesn't fit, close the current bin and go to the next.
     """
 
-    def add_rect(self, width, height, rid=None):
-        while True:
-            # if there are no open bins, try to open a new one
-            if len(self._open_bins)==0:
-                # can we find an unopened bin that will hold this rect?
-                new_bin = self._new_open_bin(width, height, rid=rid)
-                if new_bin is None:
-                    return None
+    def _pack_rects(self, rects):
+        """
+        Pack rectangles in order.
 
-            # we have at least one open bin, so check if it can hold this rect
-            rect = self._open_bins[0].add_rect(width, height, rid=rid)
-            if rect is not None:
-                return rect
+        Arguments:
+            rects: Iterable of (width, height, rid) tuples
 
-            # since the rect doesn't fit, close this bin and try again
-            closed_bin = self._open_bins.popleft()
-            self._closed_bins.append(closed_bin)
+        Returns:
+            list: Rectangle packed for each one, None if it didn't fit
+        """
+        open_bins = self._open_bins
+        packed = []
+
+        for width, height, rid in rects:
+            rect = None
+            while True:
+                # if there are no open bins, try to open a new one
+                if len(open_bins)==0:
+                    # can we find an unopened bin that will hold this rect?
+                    if self._new_open_bin(width, height, rid=rid) is None:
+                        break
+
+                # we have at least one open bin, so check if it can hold this rect
+                rect = open_bins[0].add_rect(width, height, rid=rid)
+                if rect is not None:
+                    break
+
+                # since the rect doesn't fit, close this bin and try again
+                self._close_bin(open_bins[0])
+
+            packed.append(rect)
+
+        return packed
+
+    def add_rect(self, width, height, rid=None):
+        return self._pack_rects(((width, height, rid),))[0]
 
 
 class PackerBFFMixin(object):
     """
     BFF (Bin First Fit): Pack rectangle in first bin it fits
     """
- 
-    def add_rect(self, width, height, rid=None):
-        # see if this rect will fit in any of the open bins
-        for b in self._open_bins:
-            rect = b.add_rect(width, height, rid=rid)
-            if rect is not None:
-                return rect
 
-        while True:
-            # can we find an unopened bin that will hold this rect?
-            new_bin = self._new_open_bin(width, height, rid=rid)
-            if new_bin is None:
-                return None
+    def _open_capacity(self):
+        """
+        Returns:
+            CapacityTree: Capacity of each open bin, in the same order.
+        """
+        tree = self._open_bins_capacity
+        open_bins = self._open_bins
+        for i in range(len(tree), len(open_bins)):
+            tree.append(open_bins[i].capacity())
+        return tree
 
-            # _new_open_bin may return a bin that's too small,
-            # so we have to double-check
-            rect = new_bin.add_rect(width, height, rid=rid)
-            if rect is not None:
-                return rect
+    def _pack_rects(self, rects):
+        """
+        Pack rectangles in order, the capacity tree is only brought up to
+        date after bins are opened or closed.
+
+        Arguments:
+            rects: Iterable of (width, height, rid) tuples
+
+        Returns:
+            list: Rectangle packed for each one, None if it didn't fit
+        """
+        open_bins = self._open_bins
+        rotation = self._rotation
+        tree = self._open_capacity()
+        packed = []
+
+        for width, height, rid in rects:
+            if len(tree) != len(open_bins):
+                self._open_capacity()
+
+            # see if this rect will fit in any of the open bins, skipping
+            # those where it can't by their capacity.
+            i = tree.first(width, height, rotation)
+            while i is not None:
+                b = open_bins[i]
+                rect = b.add_rect(width, height, rid=rid)
+                if rect is not None:
+                    tree.update(i, b.capacity())
+                    self._bin_used(b, rect)
+                    break
+                i = tree.first(width, height, rotation, i+1)
+            else:
+                while True:
+                    # can we find an unopened bin that will hold this rect?
+                    new_bin = self._new_open_bin(width, height, rid=rid)
+                    if new_bin is None:
+                        rect = None
+                        break
+
+                    # _new_open_bin may return a bin that's too small,
+                    # so we have to double-check
+                    rect = new_bin.add_rect(width, height, rid=rid)
+                    if rect is not None:
+                        self._bin_used(new_bin, rect)
+                        break
+
+            packed.append(rect)
+
+        return packed
+
+    def add_rect(self, width, height, rid=None):
+        return self._pack_rects(((width, height, rid),))[0]
 
 
 class PackerBBFMixin(object):
@@ -154,32 +332,66 @@ class PackerBBFMixin(object):
     BBF (Bin Best Fit): Pack rectangle in bin that gives best fitness
     """
 
-    # only create this getter once
-    first_item = operator.itemgetter(0)
+    def _open_regions(self):
+        """
+        Returns:
+            _RegionIndex: Free regions of all the open bins
+        """
+        index = self._open_bins_regions
+        open_bins = self._open_bins
+        for i in range(len(index), len(open_bins)):
+            index.add_bin(open_bins[i])
+        return index
 
-    def add_rect(self, width, height, rid=None):
- 
-        # Try packing into open bins
-        fit = ((b.fitness(width, height),  b) for b in self._open_bins)
-        fit = (b for b in fit if b[0] is not None)
-        try:
-            _, best_bin = min(fit, key=self.first_item)
-            best_bin.add_rect(width, height, rid)
-            return True
-        except ValueError:
-            pass    
+    def _pack_rects(self, rects):
+        """
+        Pack rectangles in order, the region index is only brought up to
+        date after bins are opened or closed.
 
-        # Try packing into one of the empty bins
-        while True:
-            # can we find an unopened bin that will hold this rect?
-            new_bin = self._new_open_bin(width, height, rid=rid)
-            if new_bin is None:
-                return False
+        Arguments:
+            rects: Iterable of (width, height, rid) tuples
 
-            # _new_open_bin may return a bin that's too small,
-            # so we have to double-check
-            if new_bin.add_rect(width, height, rid):
-                return True
+        Returns:
+            list: True for each rectangle packed, False if it didn't fit
+        """
+        open_bins = self._open_bins
+        rotation = self._rotation
+        index = self._open_regions()
+        packed = []
+
+        for width, height, rid in rects:
+            # Closing a bin replaces the index
+            if index is not self._open_bins_regions or \
+                    len(index) != len(open_bins):
+                index = self._open_regions()
+
+            # Try packing into open bins
+            best_bin = index.best_bin(width, height, rotation)
+            if best_bin is not None:
+                self._bin_used(best_bin, best_bin.add_rect(width, height, rid))
+                packed.append(True)
+                continue
+
+            # Try packing into one of the empty bins
+            while True:
+                # can we find an unopened bin that will hold this rect?
+                new_bin = self._new_open_bin(width, height, rid=rid)
+                if new_bin is None:
+                    packed.append(False)
+                    break
+
+                # _new_open_bin may return a bin that's too small,
+                # so we have to double-check
+                rect = new_bin.add_rect(width, height, rid)
+                if rect:
+                    self._bin_used(new_bin, rect)
+                    packed.append(True)
+                    break
+
+        return packed
+
+    def add_rect(self, width, height, rid=None):
+        return self._pack_rects(((width, height, rid),))[0]
 
 
 
@@ -188,14 +400,27 @@ class PackerOnline(object):
     Rectangles are packed as soon are they are added
     """
 
-    def __init__(self, pack_algo=MaxRectsBssf, rotation=True):
+    def __init__(self, pack_algo=MaxRectsBssf, rotation=True,
+            max_open_bins=None, close_ratio=None):
         """
         Arguments:
             pack_algo (PackingAlgorithm): What packing algo to use
             rotation (bool): Enable/Disable rectangle rotation
+            max_open_bins (int): Maximum number of open bins, the least 
+                recently used one is closed before opening another.
+                Unlimited when None.
+            close_ratio (float): Close bins as soon as the area used is at
+                least this fraction of the bin area. Never when None.
         """
+        if max_open_bins is not None and max_open_bins < 1:
+            raise ValueError("max_open_bins must be at least 1")
+        if close_ratio is not None and not 0 < close_ratio <= 1:
+            raise ValueError("close_ratio must be in the range (0, 1]")
+
         self._rotation = rotation
         self._pack_algo = pack_algo
+        self._max_open_bins = max_open_bins
+        self._close_ratio = close_ratio
         self.reset()
 
     def __iter__(self):
@@ -224,48 +449,136 @@ class PackerOnline(object):
         else:
             return self._open_bins[key-len(self._closed_bins)]
 
+    def _close_bin(self, pbin):
+        """
+        Move an open bin to the closed bins, no more rectangles are packed
+        into it.
+
+        Arguments:
+            pbin (PackingAlgorithm): Open bin
+        """
+        self._open_bins.remove(pbin)
+        self._closed_bins.append(pbin)
+        self._last_used.pop(id(pbin), None)
+        self._used_area.pop(id(pbin), None)
+
+        # Bin positions changed, indexes are built again when needed
+        if len(self._open_bins_capacity):
+            self._open_bins_capacity.clear()
+        if len(self._open_bins_regions):
+            self._open_bins_regions.close()
+            self._open_bins_regions = _RegionIndex()
+
+    def _bin_used(self, pbin, rect):
+        """
+        Called after a rectangle is packed into an open bin, closes it when
+        close_ratio is reached.
+
+        Arguments:
+            pbin (PackingAlgorithm): Bin
+            rect (Rectangle): Rectangle packed
+        """
+        self._last_used[id(pbin)] = next(self._use_count)
+        if self._close_ratio is None:
+            return
+
+        used = self._used_area.get(id(pbin), 0)+rect.area()
+        self._used_area[id(pbin)] = used
+        if used >= self._close_ratio*pbin.width*pbin.height:
+            self._close_bin(pbin)
+
     def _new_open_bin(self, width=None, height=None, rid=None):
         """
-        Extract the next empty bin and append it to open bins
+        Extract the next empty bin and append it to open bins, when there
+        are already max_open_bins open the least recently used is closed.
 
         Returns:
             PackingAlgorithm: Initialized empty packing bin.
             None: No bin big enough for the rectangle was found
         """
-        factories_to_delete = set() #
-        new_bin = None
+        # First factory (in the order bins were added) the rectangle fits in
+        key = self._empty_bins_capacity.first(width, height, self._rotation)
+        if key is None:
+            return None
 
-        for key, binfac in self._empty_bins.items():
+        binfac = self._empty_bins[key]
+        new_bin = binfac.new_bin()
 
-            # Only return the new bin if the rect fits.
-            # (If width or height is None, caller doesn't know the size.)
-            if not binfac.fits_inside(width, height):
-                continue
-           
-            # Create bin and add to open_bins
-            new_bin = binfac.new_bin()
-            if new_bin is None:
-                continue
-            self._open_bins.append(new_bin)
+        if self._max_open_bins is not None and \
+                len(self._open_bins) >= self._max_open_bins:
+            self._close_bin(min(self._open_bins, 
+                key=lambda b: self._last_used.get(id(b), -1)))
 
-            # If the factory was depleted mark for deletion
-            if binfac.is_empty():
-                factories_to_delete.add(key)
-       
-            break
+        self._open_bins.append(new_bin)
+        self._last_used[id(new_bin)] = next(self._use_count)
 
-        # Delete marked factories
-        for f in factories_to_delete:
-            del self._empty_bins[f]
+        # If the factory was depleted remove it
+        if binfac.is_empty():
+            self._remove_factory(key)
 
         return new_bin 
 
+    def _remove_factory(self, key):
+        """
+        Arguments:
+            key (int): Key of the bin factory in _empty_bins
+        """
+        del self._empty_bins[key]
+        self._empty_bins_capacity.update(key, (0, 0, 0))
+
     def add_bin(self, width, height, count=1, **kwargs):
         # accept the same parameters as PackingAlgorithm objects
         kwargs['rot'] = self._rotation
         bin_factory = BinFactory(width, height, count, self._pack_algo, **kwargs)
         self._empty_bins[next(self._bin_count)] = bin_factory
 
+        # Keys are the factory positions in the capacity tree, an empty 
+        # bin can hold any rectangle it's big enough for.
+        if bin_factory.is_empty():
+            self._empty_bins_capacity.append((0, 0, 0))
+        else:
+            self._empty_bins_capacity.append((width, height, width*height))
+
+    def add_bins(self, widths, heights, counts=None, bids=None):
+        """
+        Add several bins at once, the same as calling add_bin for each one.
+
+        Arguments:
+            widths: Bin widths (NumPy array, array.array, buffer or iterable)
+            heights: Bin heights
+            counts: Number of bins of each size, 1 when None
+            bids: Bin identifiers, None when not provided
+        """
+        widths, heights = _compact(widths), _compact(heights)
+        counts = [1]*len(widths) if counts is None else _compact(counts)
+        bids = [None]*len(widths) if bids is None else list(bids)
+        if not len(widths) == len(heights) == len(counts) == len(bids):
+            raise ValueError("Bin columns must have the same length")
+
+        for width, height, count, bid in zip(widths, heights, counts, bids):
+            self.add_bin(width, height, count, bid=bid)
+
+    def add_rects(self, widths, heights, rids=None):
+        """
+        Pack several rectangles, in the same order as calling add_rect for
+        each one.
+
+        Arguments:
+            widths: Rectangle widths (NumPy array, array.array, buffer or
+                iterable)
+            heights: Rectangle heights
+            rids: Rectangle identifiers, None when not provided
+
+        Returns:
+            list: Value returned by add_rect for each rectangle
+        """
+        widths, heights = _compact(widths), _compact(heights)
+        rids = [None]*len(widths) if rids is None else list(rids)
+        if not len(widths) == len(heights) == len(rids):
+            raise ValueError("Rectangle columns must have the same length")
+
+        return self._pack_rects(zip(widths, heights, rids))
+
     def rect_list(self):
         rectangles = []
         bin_count = 0
@@ -294,9 +607,18 @@ class PackerOnline(object):
 
         # Bins ready to pack rectangles
         self._open_bins = collections.deque()
+        self._open_bins_capacity = CapacityTree()
+        self._open_bins_regions = _RegionIndex()
+
+        # Order of the last rectangle packed into each open bin, and area
+        # used, for max_open_bins and close_ratio.
+        self._use_count = itertools.count()
+        self._last_used = {}
+        self._used_area = {}
 
         # User provided bins not in current use
         self._empty_bins = collections.OrderedDict() # O(1) deletion of arbitrary elem
+        self._empty_bins_capacity = CapacityTree()
         self._bin_count = itertools.count()
 
 
@@ -306,29 +628,66 @@ class Packer(PackerOnline):
     """
 
     def __init__(self, pack_algo=MaxRectsBssf, sort_algo=SORT_NONE, 
-            rotation=True):
+            rotation=True, *args, **kwargs):
         """
         """
-        super(Packer, self).__init__(pack_algo=pack_algo, rotation=rotation)
+        super(Packer, self).__init__(pack_algo=pack_algo, rotation=rotation,
+            *args, **kwargs)
         
         self._sort_algo = sort_algo
 
-        # User provided bins and Rectangles
-        self._avail_bins = collections.deque()
-        self._avail_rect = collections.deque()
+        # User provided bins (width, height, count, bid) and Rectangles
+        self._avail_bins = _Columns(4, defaults=(None, None, 1, None))
+        self._avail_bins_kwargs = {} # Row -> other PackingAlgorithm arguments
+        self._avail_rect = _Columns(3) # width, height, rid
 
         # Aux vars used during packing
         self._sorted_rect = []
 
     def add_bin(self, width, height, count=1, **kwargs):
-        self._avail_bins.append((width, height, count, kwargs))
+        bid = kwargs.pop('bid', None)
+        if kwargs:
+            self._avail_bins_kwargs[len(self._avail_bins)] = kwargs
+        self._avail_bins.append((width, height, count, bid))
+
+    def add_bins(self, widths, heights, counts=None, bids=None):
+        """
+        Add several bins, stored by column until pack() is called.
+
+        Arguments:
+            widths: Bin widths (NumPy array, array.array, buffer or iterable)
+            heights: Bin heights
+            counts: Number of bins of each size, 1 when None
+            bids: Bin identifiers, None when not provided
+        """
+        self._avail_bins.extend(widths, heights, counts, bids)
 
     def add_rect(self, width, height, rid=None):
         self._avail_rect.append((width, height, rid))
 
+    def add_rects(self, widths, heights, rids=None):
+        """
+        Add several rectangles to pack, stored by column until pack() is
+        called.
+
+        Arguments:
+            widths: Rectangle widths (NumPy array, array.array, buffer or
+                iterable)
+            heights: Rectangle heights
+            rids: Rectangle identifiers, None when not provided
+        """
+        self._avail_rect.extend(widths, heights, rids)
+
     def _is_everything_ready(self):
         return self._avail_rect and self._avail_bins
 
+    def _add_avail_bins(self):
+        """Add the bins stored until pack() is called to the packer"""
+        for i, (width, height, count, bid) in enumerate(self._avail_bins):
+            extra_kwargs = self._avail_bins_kwargs.get(i, {})
+            super(Packer, self).add_bin(width, height, count, bid=bid, 
+                    **extra_kwargs)
+
     def pack(self):
 
         self.reset()
@@ -338,16 +697,13 @@ class Packer(PackerOnline):
             return
 
         # Add available bins to packer
-        for b in self._avail_bins:
-            width, height, count, extra_kwargs = b
-            super(Packer, self).add_bin(width, height, count, **extra_kwargs)
+        self._add_avail_bins()
 
         # If enabled sort rectangles
         self._sorted_rect = self._sort_algo(self._avail_rect)
 
         # Start packing
-        for r in self._sorted_rect:
-            super(Packer, self).add_rect(*r)
+        self._pack_rects(self._sorted_rect)
 
 
  
@@ -389,6 +745,218 @@ class PackerOnlineBBF(PackerOnline, PackerBBFMixin):
     pass
 
 
+class _FitnessQueue(object):
+    """
+    Priority queue with the fitness of the rectangles not packed yet into a 
+    bin, used by PackerGlobal when the bin reports free region changes
+    (see PackingAlgorithm._free_regions).
+
+    Rectangles with the same size share the same score. After each placement
+    the sizes whose best region was removed are scored again against all the
+    free regions, and the rest are only compared with the new regions. Both
+    are done in a single pass over the regions, where each region is only
+    scored for the sizes narrow enough to fit into it.
+    Outdated heap entries are discarded when they reach the top.
+    """
+
+    def __init__(self, pbin, rectangles):
+        """
+        Arguments:
+            pbin (PackingAlgorithm): Bin where the rectangles are packed
+            rectangles (OrderedDict): Rectangles not packed yet 
+                {key: (width, height, rid), ...} in packing order
+        """
+        self._bin = pbin
+        self._groups = collections.OrderedDict() # size -> deque of keys
+        self._score = {} # size -> best fitness
+        self._best = {}  # size -> region with the best fitness
+        self._watchers = collections.defaultdict(set) # id(region) -> sizes
+        self._heap = []
+        self._added = []
+        self._removed = []
+
+        for key, r in rectangles.items():
+            size = self._size(r[0], r[1])
+            self._groups.setdefault(size, collections.deque()).append(key)
+
+        # Sizes with rectangles left, sorted for _best_regions
+        self._sizes = sorted(self._groups)
+        for size, (score, region) in pbin._best_regions(self._sizes).items():
+            self._set_score(size, score, region)
+
+        pbin.subscribe(self)
+
+    def _size(self, width, height):
+        # Fitness is the same for both orientations when rotation is enabled
+        if self._bin.rot and width > height:
+            return (height, width)
+        return (width, height)
+
+    def region_added(self, pbin, region):
+        self._added.append(region)
+
+    def region_removed(self, pbin, region):
+        self._removed.append(region)
+
+    def _set_score(self, size, score, region):
+        old = self._best.get(size)
+        if old is not None:
+            self._watchers[id(old)].discard(size)
+
+        self._score[size] = score
+        self._best[size] = region
+        if region is not None:
+            self._watchers[id(region)].add(size)
+            heapq.heappush(self._heap, (score, self._groups[size][0], size))
+
+    def _update(self):
+        """
+        Update scores with the free region changes since the last call.
+        """
+        added = {id(r): r for r in self._added}
+        removed = {id(r): r for r in self._removed}
+
+        # Regions generated and discarded during the same placement
+        for i in set(added).intersection(removed):
+            del added[i]
+            del removed[i]
+        
+        dirty = set()
+        for i in removed:
+            dirty.update(self._watchers.pop(i, ()))
+        dirty.intersection_update(self._groups)
+        
+        if added:
+            clean = [s for s in self._sizes if s not in dirty]
+            best = self._bin._best_regions(clean, added.values())
+            for size, (score, region) in best.items():
+                if score is None:
+                    continue
+                if self._score[size] is None or score < self._score[size]:
+                    self._set_score(size, score, region)
+
+        if dirty:
+            for size in dirty:
+                self._best[size] = None
+            best = self._bin._best_regions(sorted(dirty))
+            for size, (score, region) in best.items():
+                self._set_score(size, score, region)
+
+        self._added = []
+        self._removed = []
+
+    def pop(self):
+        """
+        Remove the rectangle with the best fitness from the queue, on ties
+        the first one in packing order.
+
+        Returns:
+            key of the rectangle with best fitness
+            None: None of the rectangles fit
+        """
+        self._update()
+
+        while self._heap:
+            score, key, size = heapq.heappop(self._heap)
+            group = self._groups.get(size)
+            if not group or group[0] != key or self._score[size] != score:
+                continue # Outdated entry
+
+            group.popleft()
+            if group:
+                heapq.heappush(self._heap, (score, group[0], size))
+            else:
+                del self._groups[size]
+                del self._sizes[bisect.bisect_left(self._sizes, size)]
+                self._set_score(size, None, None)
+            return key
+
+        return None
+
+    def close(self):
+        self._bin.unsubscribe(self)
+
+
+
+class _RegionIndex(object):
+    """
+    Free regions of all the open bins indexed by size, used by BBF to find
+    the bin with the best fitness with one query instead of asking every 
+    bin. Bins report their region changes (see PackingAlgorithm.subscribe),
+    those without free regions are still asked for their fitness.
+    """
+
+    def __init__(self):
+        self._sizes = SizeIndex()
+        self._bins = []     # Registered bins in open order
+        self._position = {} # id(bin) -> position in _bins
+        self._owner = {}    # id(region) -> position of its bin
+        self._scanned = []  # Positions of the bins without free regions
+
+    def __len__(self):
+        return len(self._bins)
+
+    def add_bin(self, pbin):
+        """
+        Arguments:
+            pbin (PackingAlgorithm): Bin opened after the ones already added
+        """
+        self._position[id(pbin)] = len(self._bins)
+        self._bins.append(pbin)
+
+        regions = pbin._free_regions()
+        if regions is None:
+            self._scanned.append(len(self._bins)-1)
+            return
+
+        for region in regions:
+            self.region_added(pbin, region)
+        pbin.subscribe(self)
+
+    def region_added(self, pbin, region):
+        self._sizes.add(region)
+        self._owner[id(region)] = self._position[id(pbin)]
+
+    def region_removed(self, pbin, region):
+        self._sizes.remove(region)
+        del self._owner[id(region)]
+
+    def best_bin(self, width, height, rot=True):
+        """
+        Bin with the best fitness for a rectangle, the same as calling
+        fitness() on every bin.
+
+        Returns:
+            PackingAlgorithm: Bin with the best fitness, on ties the first
+                one opened.
+            None: The rectangle doesn't fit in any bin
+        """
+        best = None # (fitness, bin position)
+
+        regions = self._sizes.containing(width, height)
+        if rot and width != height:
+            regions += self._sizes.containing(height, width)
+
+        for region in regions:
+            position = self._owner[id(region)]
+            fitness = self._bins[position]._region_fitness(region, width, height)
+            if fitness is not None and (best is None or (fitness, position) < best):
+                best = (fitness, position)
+
+        for position in self._scanned:
+            fitness = self._bins[position].fitness(width, height)
+            if fitness is not None and (best is None or (fitness, position) < best):
+                best = (fitness, position)
+
+        return None if best is None else self._bins[best[1]]
+
+    def close(self):
+        for b in self._bins:
+            if b._free_regions() is not None:
+                b.unsubscribe(self)
+
+
+
 class PackerGlobal(Packer, PackerBNFMixin):
     """ 
     GLOBAL: For each bin pack the rectangle with the best fitness.
@@ -411,7 +979,8 @@ class PackerGlobal(Packer, PackerBNFMixin):
         Returns:
             key of the rectangle with best fitness
         """
-        fit = ((pbin.fitness(r[0], r[1]), k) for k, r in self._sorted_rect.items())
+        sizes = ((r[0], r[1]) for r in self._sorted_rect.values())
+        fit = zip(pbin.fitness_many(sizes), self._sorted_rect.keys())
         fit = (f for f in fit if f[0] is not None)
         try:
             _, rect = min(fit, key=self.first_item)
@@ -423,7 +992,7 @@ class PackerGlobal(Packer, PackerBNFMixin):
     def _new_open_bin(self, remaining_rect):
         """
         Extract the next bin where at least one of the rectangles in
-        rem
+        remaining_rect fits. Bins where none of them fit are discarded.
 
         Arguments:
             remaining_rect (dict): rectangles not placed yet
@@ -432,38 +1001,36 @@ class PackerGlobal(Packer, PackerBNFMixin):
             PackingAlgorithm: Initialized empty packing bin.
             None: No bin big enough for the rectangle was found
         """
-        factories_to_delete = set() #
-        new_bin = None
+        if not remaining_rect:
+            return None
 
-        for key, binfac in self._empty_bins.items():
+        # Every remaining rectangle is at least this big, so bins smaller 
+        # than that are skipped without testing each rectangle.
+        if self._rotation:
+            width = min(min(r[0], r[1]) for r in remaining_rect.values())
+            height = min(max(r[0], r[1]) for r in remaining_rect.values())
+        else:
+            width = min(r[0] for r in remaining_rect.values())
+            height = min(r[1] for r in remaining_rect.values())
 
-            # Only return the new bin if at least one of the remaining 
-            # rectangles fit inside.
-            a_rectangle_fits = False
-            for _, rect in remaining_rect.items():
-                if binfac.fits_inside(rect[0], rect[1]):
-                    a_rectangle_fits = True
-                    break
+        key = -1
+        while True:
+            key = self._empty_bins_capacity.first(width, height,
+                    self._rotation, key+1)
+            if key is None:
+                return None
 
-            if not a_rectangle_fits:
-                factories_to_delete.add(key)
-                continue
-           
-            # Create bin and add to open_bins
-            new_bin = binfac.new_bin()
-            if new_bin is None:
-                continue
-            self._open_bins.append(new_bin)
+            binfac = self._empty_bins[key]
+            if any(binfac.fits_inside(r[0], r[1]) for r in remaining_rect.values()):
+                break
+            self._remove_factory(key)
 
-            # If the factory was depleted mark for deletion
-            if binfac.is_empty():
-                factories_to_delete.add(key)
-       
-            break
+        new_bin = binfac.new_bin()
+        self._open_bins.append(new_bin)
 
-        # Delete marked factories
-        for f in factories_to_delete:
-            del self._empty_bins[f]
+        # If the factory was depleted remove it
+        if binfac.is_empty():
+            self._remove_factory(key)
 
         return new_bin 
 
@@ -475,9 +1042,7 @@ class PackerGlobal(Packer, PackerBNFMixin):
             return
         
         # Add available bins to packer
-        for b in self._avail_bins:
-            width, height, count, extra_kwargs = b
-            super(Packer, self).add_bin(width, height, count, **extra_kwargs)
+        self._add_avail_bins()
     
         # Store rectangles into dict for fast deletion
         self._sorted_rect = collections.OrderedDict(
@@ -494,12 +1059,24 @@ class PackerGlobal(Packer, PackerBNFMixin):
             if pbin is None:
                 break
 
+            # Bins reporting free region changes only rescore the rectangles
+            # affected by the last placement.
+            queue = None
+            if pbin._free_regions() is not None:
+                queue = _FitnessQueue(pbin, self._sorted_rect)
+
             # Pack as many rectangles as possible into the open bin
             while True:
               
                 # Find 'fittest' rectangle
-                best_rect_key = self._find_best_fit(pbin)
+                if queue is not None:
+                    best_rect_key = queue.pop()
+                else:
+                    best_rect_key = self._find_best_fit(pbin)
+
                 if best_rect_key is None:
+                    if queue is not None:
+                        queue.close()
                     closed_bin = self._open_bins.popleft()
                     self._closed_bins.append(closed_bin)
                     break # None of the remaining rectangles can be packed in this bin
@@ -525,7 +1102,9 @@ def newPacker(mode=PackingMode.Offline,
          bin_algo=PackingBin.BBF, 
         pack_algo=MaxRectsBssf,
         sort_algo=SORT_AREA, 
-        rotation=True):
+        rotation=True,
+        max_open_bins=None,
+        close_ratio=None):
     """
     Packer factory helper function
 
@@ -536,6 +1115,9 @@ def newPacker(mode=PackingMode.Offline,
         bin_algo (PackingBin): Bin selection heuristic
         pack_algo (PackingAlgorithm): Algorithm used
         rotation (boolean): Enable or disable rectangle rotation. 
+        max_open_bins (int): Maximum number of open bins for BFF and BBF
+        close_ratio (float): Fraction of the bin area used that closes it,
+            for BFF and BBF
 
     Returns:
         Packer: Initialized packer instance.
@@ -571,10 +1153,20 @@ def newPacker(mode=PackingMode.Offline,
     else:
         raise AttributeError("Unknown packing mode.")
 
+    # Only BFF and BBF keep several bins open
+    kwargs = {}
+    if max_open_bins is not None:
+        kwargs['max_open_bins'] = max_open_bins
+    if close_ratio is not None:
+        kwargs['close_ratio'] = close_ratio
+    if kwargs and bin_algo not in (PackingBin.BFF, PackingBin.BBF):
+        raise ValueError("max_open_bins and close_ratio are only supported "
+            "by the BFF and BBF bin selection heuristics")
+
     if sort_algo:
         return packer_class(pack_algo=pack_algo, sort_algo=sort_algo, 
-            rotation=rotation)
+            rotation=rotation, **kwargs)
     else:
-        return packer_class(pack_algo=pack_algo, rotation=rotation)
+        return packer_class(pack_algo=pack_algo, rotation=rotation, **kwargs)
 
 
@@ -1,4 +1,5 @@
 import collections
+import bisect
 import itertools
 import operator
 import heapq
@@ -14,6 +15,11 @@ class Skyline(PackingAlgorithm):
     Jukka Jylanki - A Thousand Ways to Pack the Bin (February 27, 2010)
 
     _skyline:  stores all the segments at the top of the skyline.
+    _skyline_lefts: x coordinate of each segment left end, for bisect lookups.
+    _skyline_rights: x coordinate of each segment right end.
+    _skyline_tops: y coordinate of each segment.
+    _top_counts: number of segments at each y coordinate.
+    _skyline_heap: heap of segment y coordinates, used to find the lowest.
     _waste: Handles all wasted sections.
     """
 
@@ -32,9 +38,12 @@ class Skyline(PackingAlgorithm):
         """
         self._waste_management = False
         self._waste = WasteManager(rot=rot)
+        self._support_cache = None
+        self._prefix_sums = None
+        self._prefix_sums_version = None
         super(Skyline, self).__init__(width, height, rot, merge=False, *args, **kwargs)
 
-    def _placement_points_generator(self, skyline, width):
+    def _placement_points_generator(self, lefts, rights, width):
         """Returns a generator for the x coordinates of all the placement
         points on the skyline for a given rectangle.
 
@@ -42,78 +51,104 @@ class Skyline(PackingAlgorithm):
         to compute them twice than to remove them.
         
         Arguments:
-            skyline (list): Skyline HSegment list
+            lefts (list): Skyline segments left x coordinate
+            rights (list): Skyline segments right x coordinate
             width (int, float): Rectangle width
 
         Returns:
             generator
         """ 
-        skyline_r = skyline[-1].right
-        skyline_l = skyline[0].left
+        skyline_r = rights[-1]
+        skyline_l = lefts[0]
 
         # Placements using skyline segment left point
-        ppointsl = (s.left for s in skyline if s.left+width <= skyline_r)
+        ppointsl = (l for l in lefts if l+width <= skyline_r)
 
         # Placements using skyline segment right point
-        ppointsr = (s.right-width for s in skyline if s.right-width >= skyline_l)
+        ppointsr = (r-width for r in rights if r-width >= skyline_l)
 
         # Merge positions
         return heapq.merge(ppointsl, ppointsr)
 
-    def _generate_placements(self, width, height):
+    def _support_points(self, width):
         """
-        Generate a list with 
+        Find the height at which a rectangle of the given width would rest
+        at each placement point. It doesn't depend on the rectangle height,
+        so while fitness_many is running the result is cached by width.
 
         Arguments:
-            skyline (list): SkylineHSegment list
-            width (number):
+            width (number): Rectangle width
 
         Returns:
-            tuple (Rectangle, fitness):
-                Rectangle: Rectangle in valid position
-                left_skyline: Index for the skyline under the rectangle left edge.
-                right_skyline: Index for the skyline under the rectangle right edte.
+            list: [(x, support_height, left_index, right_index), ...]
+                left_index: Index for the skyline under the rectangle left edge.
+                right_index: Index for the skyline under the rectangle right edge.
+        """
+        if self._support_cache is not None:
+            if width not in self._support_cache:
+                self._support_cache[width] = self._find_support_points(width)
+            return self._support_cache[width]
+
+        return self._find_support_points(width)
+
+    def _find_support_points(self, width):
+        """
+        The support height is the maximum of a window of segments sliding 
+        right as the placement points increase, it is tracked with a deque 
+        of segment indexes with decreasing heights so each segment is only 
+        added and removed once.
         """
-        skyline = self._skyline
+        tops = self._skyline_tops
+        rights = self._skyline_rights
+        last = len(tops)-1
 
-        points = collections.deque()
+        points = []
 
         left_index = right_index = 0 # Left and right side skyline index
-        support_height = skyline[0].top
-        support_index = 0 
+        window = collections.deque([0]) # Support candidates, highest first
     
-        placements = self._placement_points_generator(skyline, width)
+        placements = self._placement_points_generator(self._skyline_lefts,
+                rights, width)
         for p in placements:
 
-            # If Rectangle's right side changed segment, find new support
-            if p+width > skyline[right_index].right:
-                for right_index in range(right_index+1, len(skyline)):
-                    if skyline[right_index].top >= support_height:
-                        support_index = right_index
-                        support_height = skyline[right_index].top
-                    if p+width <= skyline[right_index].right:
-                        break
+            # If Rectangle's right side changed segment, add the new ones
+            while right_index < last and p+width > rights[right_index]:
+                right_index += 1
+                while window and tops[window[-1]] <= tops[right_index]:
+                    window.pop()
+                window.append(right_index)
                 
             # If left side changed segment.
-            if p >= skyline[left_index].right:
+            if p >= rights[left_index]:
                 left_index +=1
            
-            # Find new support if the previous one was shifted out.
-            if support_index < left_index:
-                support_index = left_index
-                support_height = skyline[left_index].top
-                for i in range(left_index, right_index+1):
-                    if skyline[i].top >= support_height:
-                        support_index = i
-                        support_height = skyline[i].top
-
-            # Add point if there is enought room at the top
-            if support_height+height <= self.height:
-                points.append((Rectangle(p, support_height, width, height),\
-                    left_index, right_index))
+            # Drop the support if it was shifted out.
+            while window[0] < left_index:
+                window.popleft()
+
+            points.append((p, tops[window[0]], left_index, right_index))
 
         return points
 
+    def _generate_placements(self, width, height):
+        """
+        Generate a list with all the valid positions for a rectangle
+
+        Arguments:
+            width (number): Rectangle width
+            height (number): Rectangle height
+
+        Returns:
+            list of tuples (Rectangle, left_skyline, right_skyline):
+                Rectangle: Rectangle in valid position
+                left_skyline: Index for the skyline under the rectangle left edge.
+                right_skyline: Index for the skyline under the rectangle right edte.
+        """
+        # Add point if there is enought room at the top
+        return [(Rectangle(p, support, width, height), left, right)
+                for p, support, left, right in self._support_points(width)
+                if support+height <= self.height]
+
     def _merge_skyline(self, skylineq, segment):
         """
         Arguments:
@@ -130,14 +165,60 @@ class Skyline(PackingAlgorithm):
         else:
             skylineq.append(segment)
 
+    def _replace_skyline(self, start, end, segments):
+        """
+        Replace the skyline segments in positions [start, end) with new ones,
+        the rest of the skyline isn't visited.
+
+        Arguments:
+            start (int): First segment replaced
+            end (int): Last segment replaced + 1
+            segments (list): New HSegments
+        """
+        counts = self._top_counts
+        for top in self._skyline_tops[start:end]:
+            counts[top] -= 1
+            if not counts[top]:
+                del counts[top]
+
+        tops = [s.top for s in segments]
+        for top in tops:
+            if top not in counts:
+                counts[top] = 0
+                heapq.heappush(self._skyline_heap, top)
+            counts[top] += 1
+
+        self._skyline[start:end] = segments
+        self._skyline_lefts[start:end] = [s.left for s in segments]
+        self._skyline_rights[start:end] = [s.right for s in segments]
+        self._skyline_tops[start:end] = tops
+        self._version += 1
+
+    def _skyline_floor(self):
+        """
+        Returns:
+            number: y coordinate of the lowest skyline segment
+        """
+        heap = self._skyline_heap
+        while heap[0] not in self._top_counts:
+            heapq.heappop(heap)
+        return heap[0]
+
     def _add_skyline(self, rect):
         """
         Arguments:
             seg (Rectangle):
         """
         skylineq = collections.deque([]) # Skyline after adding new one
+
+        # Only the segments under the rectangle and their neighbours can 
+        # change, adjacent segments never have the same height so the rest 
+        # won't be merged.
+        lefts = self._skyline_lefts
+        start = max(bisect.bisect_right(lefts, rect.left)-2, 0)
+        end = min(bisect.bisect_left(lefts, rect.right)+1, len(lefts))
         
-        for sky in self._skyline:
+        for sky in self._skyline[start:end]:
             if sky.right <= rect.left or sky.left >= rect.right:
                 self._merge_skyline(skylineq, sky)
                 continue
@@ -168,11 +249,73 @@ class Skyline(PackingAlgorithm):
                 self._merge_skyline(skylineq, sky)
 
         # Aaaaand ..... Done
-        self._skyline = list(skylineq)
+        self._replace_skyline(start, end, list(skylineq))
 
     def _rect_fitness(self, rect, left_index, right_index):
         return rect.top
 
+    def _skyline_sums(self):
+        """
+        Prefix sums of the skyline segments length and length*top, rebuilt
+        once after each skyline change.
+
+        Returns:
+            (lengths, areas): Lists where item i is the sum for the segments
+                before position i.
+            None: Some coordinate isn't an integer, float sums would be 
+                rounded differently than adding the segments one by one.
+        """
+        if self._prefix_sums_version != self._version:
+            self._prefix_sums_version = self._version
+
+            lefts, rights = self._skyline_lefts, self._skyline_rights
+            tops = self._skyline_tops
+            if all(isinstance(v, int) for v in itertools.chain(lefts, rights, tops)):
+                lengths = list(map(operator.sub, rights, lefts))
+                self._prefix_sums = (
+                    [0]+list(itertools.accumulate(lengths)),
+                    [0]+list(itertools.accumulate(map(operator.mul, lengths, tops))))
+            else:
+                self._prefix_sums = None
+
+        return self._prefix_sums
+
+    def _wasted_area(self, rect, left_index, right_index):
+        """
+        Area left empty under a rectangle placed over the skyline segments
+        from left_index to right_index, computed from the prefix sums in
+        constant time when possible.
+
+        Arguments:
+            rect (Rectangle): Rectangle in a valid position
+            left_index (int): Index for the skyline under the rectangle left edge
+            right_index (int): Index for the skyline under the rectangle right edge
+
+        Returns:
+            int, float: Wasted area
+        """
+        sums = self._skyline_sums()
+        if sums is None or not isinstance(rect.width, int):
+            waste = 0
+            for seg in self._skyline[left_index:right_index+1]:
+                waste +=\
+                    (min(rect.right, seg.right)-max(rect.left, seg.left)) *\
+                    (rect.bottom-seg.top)
+            return waste
+
+        # Segments fully under the rectangle, minus the parts of the first 
+        # and last ones sticking out.
+        lengths, areas = sums
+        tops = self._skyline_tops
+        bottom = rect.bottom
+        waste = bottom*(lengths[right_index+1]-lengths[left_index]) -\
+            (areas[right_index+1]-areas[left_index])
+        waste -= (rect.left-self._skyline_lefts[left_index]) *\
+            (bottom-tops[left_index])
+        waste -= (self._skyline_rights[right_index]-rect.right) *\
+            (bottom-tops[right_index])
+        return waste
+
     def _select_position(self, width, height):
         """
         Search for the placement with the bes fitness for the rectangle.
@@ -189,6 +332,19 @@ class Skyline(PackingAlgorithm):
         return min(((p[0], self._rect_fitness(*p))for p in positions), 
                 key=operator.itemgetter(1))
 
+    def capacity(self):
+        """
+        Rectangles placed over the skyline rest at least on its lowest
+        segment, and when waste management is enabled they may also go
+        into one of the wasted sections.
+        """
+        width, height = self.width, self.height-self._skyline_floor()
+        if not self._waste_management:
+            return width, height, width*height
+
+        wwidth, wheight, warea = self._waste.capacity()
+        return max(width, wwidth), max(height, wheight), max(width*height, warea)
+
     def fitness(self, width, height):
         """Search for the best fitness 
         """
@@ -197,6 +353,9 @@ class Skyline(PackingAlgorithm):
             height > max(self.height, self.width):
             return None
 
+        if not self._may_fit(width, height):
+            return None
+
         # If there is room in wasted space, FREE PACKING!!
         if self._waste_management:
             if self._waste.fitness(width, height) is not None:
@@ -204,9 +363,21 @@ class Skyline(PackingAlgorithm):
 
         # Get best fitness segment, for normal rectangle, and for
         # rotated rectangle if rotation is enabled.
-        rect, fitness = self._select_position(width, height)
+        rect, fitness = self._cache_placement(width, height,
+                self._select_position(width, height))
         return fitness
 
+    def fitness_many(self, sizes):
+        """
+        Fitness for several rectangles at once, candidate positions are
+        only generated once for each distinct rectangle width.
+        """
+        self._support_cache = {}
+        try:
+            return super(Skyline, self).fitness_many(sizes)
+        finally:
+            self._support_cache = None
+
     def add_rect(self, width, height, rid=None):
         """
         Add new rectangle
@@ -216,14 +387,21 @@ class Skyline(PackingAlgorithm):
             height > max(self.height, self.width):
             return None
 
+        if not self._may_fit(width, height):
+            return None
+
         rect = None
         # If Waste managment is enabled, first try to place the rectangle there
         if self._waste_management:
             rect = self._waste.add_rect(width, height, rid)
 
-        # Get best possible rectangle position
+        # Get best possible rectangle position, unless fitness() already
+        # found it.
         if not rect:
-            rect, _ = self._select_position(width, height)
+            placement = self._cached_placement(width, height)
+            if placement is None:
+                placement = self._select_position(width, height)
+            rect, _ = placement
             if rect:
                 self._add_skyline(rect)
 
@@ -259,7 +437,13 @@ class Skyline(PackingAlgorithm):
 
     def reset(self):
         super(Skyline, self).reset()
-        self._skyline = [HSegment(P(0, 0), self.width)]
+        self._skyline = []
+        self._skyline_lefts = []
+        self._skyline_rights = []
+        self._skyline_tops = []
+        self._top_counts = {}
+        self._skyline_heap = []
+        self._replace_skyline(0, 0, [HSegment(P(0, 0), self.width)])
         self._waste.reset()
 
 
@@ -277,13 +461,7 @@ class SkylineMwf(Skyline):
     rectangle.
     """
     def _rect_fitness(self, rect, left_index, right_index):
-        waste = 0
-        for seg in self._skyline[left_index:right_index+1]:
-            waste +=\
-                (min(rect.right, seg.right)-max(rect.left, seg.left)) *\
-                (rect.bottom-seg.top)
-
-        return waste
+        return self._wasted_area(rect, left_index, right_index)
 
     def _rect_fitnes2s(self, rect, left_index, right_index):
         waste = ((min(rect.right, seg.right)-max(rect.left, seg.left)) for seg in self._skyline[left_index:right_index+1])
@@ -295,12 +473,7 @@ class SkylineMwfl(Skyline):
     minimal.
     """ 
     def _rect_fitness(self, rect, left_index, right_index):
-        waste = 0
-        for seg in self._skyline[left_index:right_index+1]:
-            waste +=\
-                (min(rect.right, seg.right)-max(rect.left, seg.left)) *\
-                (rect.bottom-seg.top)
-
+        waste = self._wasted_area(rect, left_index, right_index)
         return waste*self.width*self.height+rect.top
 
 
@@ -0,0 +1,228 @@
+import numpy as np
+
+from .geometry import Point as P
+from .geometry import HSegment, Rectangle
+from .np_utils import is_integral
+from .skyline import Skyline, SkylineBl, SkylineMwf, SkylineMwfl, \
+    SkylineWMixin
+
+
+class SkylineNp(Skyline):
+    """Skyline variant for integer sized surfaces, the skyline is stored as
+    a NumPy array with the height at each x coordinate. The support height
+    of every placement point is found with a sparse table of sliding window
+    maximums, and rectangles are placed with a slice assignment.
+
+    Placement points and fitness are the same as in Skyline, so for integer
+    rectangles the same positions are returned.
+    """
+
+    def __init__(self, width, height, *args, **kwargs):
+        if not is_integral(width, height):
+            raise ValueError("Surface width and height must be integers")
+        self._derived = {}
+        self._derived_version = None
+        super(SkylineNp, self).__init__(width, height, *args, **kwargs)
+
+    @property
+    def _skyline(self):
+        """Height map as a list of HSegment"""
+        starts, ends = self._segments()
+        return [HSegment(P(s, top), e-s) for s, e, top in
+            zip(starts.tolist(), ends.tolist(), self._heights[starts].tolist())]
+
+    def _cache(self):
+        """
+        Returns:
+            dict: Values derived from the height map, emptied every time
+                the skyline changes.
+        """
+        if self._derived_version != self._version:
+            self._derived_version = self._version
+            self._derived = {}
+        return self._derived
+
+    def _segments(self):
+        """
+        Returns:
+            (numpy.ndarray, numpy.ndarray): Start and end x coordinate of
+                the skyline segments, consecutive positions with the same
+                height belong to the same segment.
+        """
+        cache = self._cache()
+        if 'segments' not in cache:
+            starts = np.concatenate(([0], np.flatnonzero(np.diff(self._heights))+1))
+            cache['segments'] = (starts, np.append(starts[1:], self.width))
+        return cache['segments']
+
+    def _skyline_floor(self):
+        return self._heights.min().item()
+
+    def _max_table(self, width):
+        """
+        Sparse table with the maximum height of every window of 2**k
+        positions, levels are computed on demand until the skyline changes.
+
+        Arguments:
+            width (int): Widest window needed
+
+        Returns:
+            list: level k holds the maximum height of the window starting
+                at each x coordinate with length 2**k
+        """
+        table = self._cache().setdefault('table', [self._heights])
+        while 2**len(table) <= width:
+            half = 2**(len(table)-1)
+            prev = table[-1]
+            table.append(np.maximum(prev[:-half], prev[half:]))
+
+        return table
+
+    def _placement_points(self, width):
+        """
+        Placement points for a rectangle, left side aligned with the left of
+        a segment or right side aligned with the right of a segment.
+
+        Returns:
+            numpy.ndarray: Sorted x coordinates
+        """
+        starts, ends = self._segments()
+        return np.union1d(starts[starts+width <= self.width],
+                ends[ends-width >= 0]-width)
+
+    def _support_heights(self, xs, width):
+        """
+        Returns:
+            numpy.ndarray: Maximum height under each rectangle placed at xs
+        """
+        table = self._max_table(width)
+        k = width.bit_length()-1
+        return np.maximum(table[k][xs], table[k][xs+width-2**k])
+
+    def _fitness_array(self, xs, support, width, height):
+        """
+        Vectorized Skyline._rect_fitness
+
+        Arguments:
+            xs (numpy.ndarray): Placement x coordinates
+            support (numpy.ndarray): Rectangle bottom at each placement
+            width (int): Rectangle width
+            height (int): Rectangle height
+
+        Returns:
+            numpy.ndarray: Fitness of each placement
+        """
+        return support+height
+
+    def _wasted_area_array(self, xs, support, width):
+        """Vectorized Skyline._wasted_area"""
+        cache = self._cache()
+        if 'sums' not in cache:
+            cache['sums'] = np.concatenate(([0], np.cumsum(self._heights)))
+        sums = cache['sums']
+        return support*width-(sums[xs+width]-sums[xs])
+
+    def _best_placement(self, width, height):
+        """
+        Returns:
+            (fitness, x, support): The first placement with the best
+                fitness, or None if the rectangle doesn't fit.
+        """
+        if width > self.width:
+            return None
+
+        xs = self._placement_points(width)
+        support = self._support_heights(xs, width)
+        fits = support+height <= self.height
+        if not fits.any():
+            return None
+
+        xs, support = xs[fits], support[fits]
+        fitness = self._fitness_array(xs, support, width, height)
+        best = np.argmin(fitness)
+        return (fitness[best:best+1].tolist()[0], xs[best].item(),
+                support[best].item())
+
+    def _select_position(self, width, height):
+        """
+        Search for the placement with the best fitness for the rectangle,
+        see Skyline._select_position.
+        """
+        if not is_integral(width, height):
+            raise ValueError("Rectangle width and height must be integers")
+        width, height = int(width), int(height)
+
+        candidates = [(self._best_placement(width, height), width, height)]
+        if self.rot and width != height:
+            candidates.append((self._best_placement(height, width), height, width))
+
+        # Normal orientation wins ties
+        best = None
+        for placement, w, h in candidates:
+            if placement is not None and (best is None or placement[0] < best[0][0]):
+                best = (placement, w, h)
+
+        if best is None:
+            return None, None
+
+        (fitness, x, support), w, h = best
+        return Rectangle(x, support, w, h), fitness
+
+    def _add_skyline(self, rect):
+        """
+        Arguments:
+            rect (Rectangle): Placed rectangle
+        """
+        heights = self._heights
+        left, right = max(rect.left, 0), min(rect.right, self.width)
+
+        if self._waste_management:
+            under = heights[left:right]
+            bounds = [0]+(np.flatnonzero(np.diff(under))+1).tolist()+[len(under)]
+            for start, end in zip(bounds, bounds[1:]):
+                top = under[start].item()
+                if top < rect.bottom:
+                    self._waste.add_waste(left+start, top, end-start,
+                            rect.bottom-top)
+
+        heights[left:right] = rect.top
+        self._version += 1
+
+    def reset(self):
+        # Skyline.reset builds the segment lists, not used here
+        super(Skyline, self).reset()
+        self._heights = np.zeros(self.width, dtype=np.int64)
+        self._waste.reset()
+
+
+
+class SkylineBlNp(SkylineNp, SkylineBl):
+    """Vectorized SkylineBl"""
+    pass
+
+
+class SkylineMwfNp(SkylineNp, SkylineMwf):
+    """Vectorized SkylineMwf"""
+    def _fitness_array(self, xs, support, width, height):
+        return self._wasted_area_array(xs, support, width)
+
+
+class SkylineMwflNp(SkylineNp, SkylineMwfl):
+    """Vectorized SkylineMwfl"""
+    def _fitness_array(self, xs, support, width, height):
+        waste = self._wasted_area_array(xs, support, width)
+        area = self.width*self.height
+        if area*area+self.height >= 2**63:
+            # Use python integers when the score could overflow int64
+            waste, support = waste.astype(object), support.astype(object)
+        return waste*area+support+height
+
+
+class SkylineBlWmNp(SkylineBlNp, SkylineWMixin):
+    pass
+
+class SkylineMwfWmNp(SkylineMwfNp, SkylineWMixin):
+    pass
+
+class SkylineMwflWmNp(SkylineMwflNp, SkylineWMixin):
+    pass
@@ -20,6 +20,7 @@ setup(
         "License :: OSI Approved :: Apache Software License",
     ],
     packages=["rectpack"],
+    extras_require={"numpy": ["numpy"]},
     zip_safe=False,
     test_suite="nose.collector",
     tests_require=["nose"],
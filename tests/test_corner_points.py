@@ -0,0 +1,37 @@
+from unittest import TestCase
+import rectpack.corner_points as corner_points
+from rectpack.geometry import Rectangle
+
+
+class TestCornerPointsSL(TestCase):
+
+    def test_right_view(self):
+        c = corner_points.CornerPointsSL(100, 100, rot=False)
+        c.place_rect(10, 10, 0, 0)
+        c.place_rect(50, 10, 0, 10)
+
+        # Under the overhang only the right view finds a position
+        candidates = c.select_best_position(5, 5)
+        self.assertIn(Rectangle(10, 0, 5, 5), candidates)
+        self.assertIn(Rectangle(50, 15, 5, 5), candidates)
+        self.assertEqual(len(candidates), len(set(candidates)))
+
+        # Placing below the top view doesn't lower it
+        c.place_rect(5, 5, 10, 0)
+        self.assertEqual(c._skyline_tops, [20, 0])
+        self.assertEqual(c._right_view._skyline_tops, [15, 10, 50, 0])
+        self.assertIn(Rectangle(15, 0, 5, 5), c.select_best_position(5, 5))
+
+    def test_candidates_valid(self):
+        c = corner_points.CornerPointsSL(50, 40, rot=True)
+        sizes = [(10, 20), (5, 5), (30, 10), (7, 3), (12, 12), (4, 9)]
+        for w, h in sizes*3:
+            candidates = c.select_best_position(w, h)
+            if candidates is None:
+                continue
+            for r in candidates:
+                self.assertTrue(c._surface.contains(r))
+                for placed in c:
+                    self.assertFalse(r.intersects(placed))
+            r = candidates[-1]
+            c.place_rect(r.width, r.height, r.x, r.y)
@@ -1,4 +1,5 @@
 from unittest import TestCase
+import random
 import rectpack.guillotine as guillotine
 from rectpack.geometry import Rectangle
 
@@ -84,6 +85,77 @@ class TestGuillotine(TestCase):
         fitness5 = g.fitness(45, 45)
         self.assertTrue(fitness1>fitness2>fitness3>fitness4>fitness5)
 
+    def test_fitness_many(self):
+        g = guillotine.GuillotineBafSas(100, 100, rot=False)
+        g.add_rect(60, 40)
+        sizes = [(10, 10), (40, 60), (60, 40), (10, 10), (100, 70)]
+        self.assertEqual(g.fitness_many(sizes),
+                [g.fitness(w, h) for w, h in sizes])
+        self.assertEqual(g.fitness_many(sizes)[-1], None)
+
+        # Rotation and float sizes
+        g = guillotine.GuillotineBssfMaxas(100, 100, rot=True)
+        g.add_rect(60, 40)
+        g.add_rect(20.5, 55)
+        sizes = [(10, 10), (60, 30), (30, 60), (15.5, 20), (90, 10), (61, 61)]
+        self.assertEqual(g.fitness_many(sizes),
+                [g.fitness(w, h) for w, h in sizes])
+
+    def test_exact_fit(self):
+        g = guillotine.GuillotineBlsfSas(100, 100, merge=False)
+        g._sections = [Rectangle(0, 0, 50, 50), Rectangle(70, 0, 30, 20),
+            Rectangle(50, 30, 20, 30), Rectangle(50, 0, 20, 30)]
+
+        # First perfect fit in the section list, normal orientation first
+        self.assertEqual(g._select_fittest_section(20, 30),
+                (Rectangle(50, 30, 20, 30), False))
+        self.assertEqual(g._select_fittest_section(30, 20),
+                (Rectangle(70, 0, 30, 20), False))
+        g._remove_section(g._sections[1])
+        self.assertEqual(g._select_fittest_section(30, 20),
+                (Rectangle(50, 30, 20, 30), True))
+
+        # Sections created by splits are indexed too
+        g.add_rect(50, 20)
+        self.assertEqual(g._select_fittest_section(50, 30),
+                (Rectangle(0, 20, 50, 30), False))
+
+    def test_capacity(self):
+        g = guillotine.GuillotineBafSas(100, 100, rot=False)
+        self.assertEqual(g.capacity(), (100, 100, 10000))
+        g.add_rect(100, 70)
+        self.assertEqual(g.capacity(), (100, 30, 3000))
+        self.assertEqual(g.fitness(30, 40), None)
+        self.assertEqual(g.add_rect(30, 40), None)
+
+        g.add_rect(100, 30)
+        self.assertEqual(g.capacity(), (0, 0, 0))
+
+    def test_placement_cache(self):
+        g = guillotine.GuillotineBafSas(100, 100, rot=False)
+        g.add_rect(30, 40)
+        g.fitness(40, 30)
+        section, _ = g._cached_placement(40, 30)
+
+        # add_rect reuses the section found by fitness
+        g._select_fittest_section = None
+        self.assertEqual(g.add_rect(40, 30), Rectangle(section.x, section.y, 40, 30))
+        self.assertEqual(g._cached_placement(40, 30), None)
+
+    def test_ordered_search(self):
+        # Bounded search selects the same section as testing all of them
+        random.seed(18)
+        for algo in (guillotine.GuillotineBafSas, guillotine.GuillotineBssfSas,
+                guillotine.GuillotineBlsfSas):
+            g = algo(200, 200, rot=True)
+            while g.add_rect(random.randint(1, 40), random.randint(1, 40)):
+                w, h = random.randint(1, 60), random.randint(1, 60)
+                selected = g._select_fittest_section(w, h)
+                g._ordered_search = False
+                self.assertEqual(selected, g._select_fittest_section(w, h))
+                self.assertIs(selected[0], g._select_fittest_section(w, h)[0])
+                del g._ordered_search
+
     def test_section_fitness(self):
         g1 = guillotine.GuillotineBssfSas(100, 50)
         g2 = guillotine.GuillotineBlsfSas(100, 50)
@@ -214,6 +286,31 @@ class TestGuillotine(TestCase):
         self.assertTrue(Rectangle(50, 0, 50, 50) in g._sections)
         self.assertTrue(Rectangle(0, 0, 50, 50) in g._sections)
 
+    def test_add_section_index(self):
+        # Sections found with the edge index are merged in the same order
+        # as scanning the whole free section list.
+        class ScanMerge(guillotine.GuillotineBafSas):
+            def _add_section(self, section):
+                section.rid = 0
+                joined = True
+                while self._merge and joined:
+                    joined = False
+                    for s in list(self._sections):
+                        if section.join(s):
+                            self._remove_section(s)
+                            joined = True
+                self._sections.append(section)
+                self._index_section(section)
+
+        random.seed(17)
+        for _ in range(20):
+            g = guillotine.GuillotineBafSas(60, 60)
+            ref = ScanMerge(60, 60)
+            for _ in range(40):
+                w, h = random.randint(1, 20), random.randint(1, 20)
+                self.assertEqual(g.add_rect(w, h), ref.add_rect(w, h))
+                self.assertEqual(g._sections, ref._sections)
+
     def test_getitem(self):
         """Test __getitem__ returns requested element or slice"""
         g = guillotine.GuillotineBafSas(100, 100)
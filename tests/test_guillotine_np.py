@@ -0,0 +1,70 @@
+from unittest import TestCase, SkipTest
+import random
+from rectpack.geometry import Rectangle
+import rectpack.guillotine as guillotine
+from rectpack.packer import newPacker, PackingBin
+
+try:
+    import rectpack.guillotine_np as guillotine_np
+except ImportError:
+    raise SkipTest("NumPy not installed")
+
+
+class TestGuillotineNp(TestCase):
+
+    def test_init(self):
+        g = guillotine_np.GuillotineBafSasNp(20, 50)
+        self.assertEqual(g._sections, [Rectangle(0, 0, 20, 50)])
+
+        g.add_rect(5, 5)
+        g.reset()
+        self.assertEqual(len(g), 0)
+        self.assertEqual(g._sections, [Rectangle(0, 0, 20, 50)])
+
+    def test_add_section(self):
+        # Sections are merged recursively
+        g = guillotine_np.GuillotineBafSasNp(100, 100, merge=True)
+        g._sections = [Rectangle(0, 50, 100, 50), Rectangle(50, 0, 50, 50)]
+        g._add_section(Rectangle(0, 0, 50, 50))
+        self.assertEqual(g._sections, [Rectangle(0, 0, 100, 100)])
+
+        g = guillotine_np.GuillotineBafSasNp(100, 100, merge=False)
+        g._sections = [Rectangle(0, 50, 100, 50), Rectangle(50, 0, 50, 50)]
+        g._add_section(Rectangle(0, 0, 50, 50))
+        self.assertEqual(len(g._sections), 3)
+
+    def test_float(self):
+        g = guillotine_np.GuillotineBssfSasNp(100, 100, rot=False)
+        self.assertEqual(g.add_rect(10, 10), Rectangle(0, 0, 10, 10))
+        self.assertEqual(g.add_rect(10.5, 10), Rectangle(10, 0, 10.5, 10))
+        self.assertEqual(g.capacity(), (100, 90, 9000))
+
+        # Coordinates are returned as python numbers
+        self.assertTrue(type(g.add_rect(5, 5).x) is float)
+
+    def test_same_as_guillotine(self):
+        # Vectorized variants return the same placements for every
+        # selection and split rule.
+        for selection in ('Bssf', 'Blsf', 'Baf'):
+            for split in ('Sas', 'Las', 'Slas', 'Llas', 'Maxas', 'Minas'):
+                name = 'Guillotine'+selection+split
+                for rot, merge in ((True, True), (False, True), (True, False)):
+                    rng = random.Random(20)
+                    g = getattr(guillotine, name)(150, 100, rot=rot, merge=merge)
+                    gnp = getattr(guillotine_np, name+'Np')(150, 100, rot=rot,
+                            merge=merge)
+                    for _ in range(60):
+                        w, h = rng.randint(1, 30), rng.randint(1, 30)
+                        self.assertEqual(g.fitness(w, h), gnp.fitness(w, h))
+                        self.assertEqual(g.add_rect(w, h), gnp.add_rect(w, h))
+                    self.assertEqual(g._sections, gnp._sections)
+
+    def test_packer_global(self):
+        p = newPacker(bin_algo=PackingBin.Global,
+                pack_algo=guillotine_np.GuillotineBssfSasNp)
+        p.add_bin(100, 100)
+        for _ in range(4):
+            p.add_rect(50, 50)
+        p.pack()
+        p.validate_packing()
+        self.assertEqual(len(p[0]), 4)
@@ -0,0 +1,53 @@
+from unittest import TestCase
+import random
+import rectpack.guillotine as guillotine
+import rectpack.guillotine_tree as guillotine_tree
+from rectpack.geometry import Rectangle
+
+
+class TestGuillotineTree(TestCase):
+
+    def test_same_as_guillotine(self):
+        random.seed(19)
+        for name in ('BafSas', 'BssfLas', 'BlsfMinas', 'BafSlas'):
+            t = getattr(guillotine_tree, 'GuillotineTree'+name)(200, 200)
+            g = getattr(guillotine, 'Guillotine'+name)(200, 200, merge=False)
+            for _ in range(100):
+                w, h = random.randint(1, 50), random.randint(1, 50)
+                self.assertEqual(t.add_rect(w, h), g.add_rect(w, h))
+            self.assertEqual(t._sections, g._sections)
+
+    def test_merge(self):
+        t = guillotine_tree.GuillotineTreeBafSas(100, 100, merge=False)
+        self.assertFalse(t._merge)
+        with self.assertRaises(ValueError):
+            guillotine_tree.GuillotineTreeBafSas(100, 100, merge=True)
+
+    def test_capacity(self):
+        t = guillotine_tree.GuillotineTreeBafSas(100, 100, rot=False)
+        self.assertEqual(t.capacity(), (100, 100, 10000))
+        t.add_rect(30, 40)
+        self.assertEqual(t.capacity(), (70, 100, 7000))
+        self.assertEqual(t.cut_tree().max_area, 7000)
+        t.add_rect(70, 100)
+        self.assertEqual(t.capacity(), (30, 60, 1800))
+        t.add_rect(30, 60)
+        self.assertEqual(t.capacity(), (0, 0, 0))
+
+    def test_cut_sequence(self):
+        t = guillotine_tree.GuillotineTreeBafSas(100, 100)
+        t.add_rect(30, 40, rid=1)
+        t.add_rect(50, 50, rid=2)
+        self.assertEqual(t.cut_sequence(), [
+            (0, 0, 100, 100, 'v', 30),
+            (0, 0, 30, 100, 'h', 40),
+            (30, 0, 70, 100, 'h', 50),
+            (30, 0, 70, 50, 'v', 80)])
+
+        # Leaves hold the placed rectangles and free sections
+        root = t.cut_tree()
+        self.assertEqual(root.children[0].children[0].rect.rid, 1)
+        self.assertEqual(root.children[0].children[1].section,
+                Rectangle(0, 40, 30, 60))
+        self.assertEqual(root.children[1].children[0].children[0].rect,
+                Rectangle(30, 0, 50, 50))
@@ -0,0 +1,219 @@
+from unittest import TestCase
+import random
+from rectpack.geometry import Rectangle
+from rectpack.index import QuadTree, SizeIndex, ExactSizeIndex, CapacityTree
+
+
+class TestQuadTree(TestCase):
+
+    def test_add_remove(self):
+        q = QuadTree(0, 0, 100, 100)
+        r1 = Rectangle(0, 0, 10, 10)
+        r2 = Rectangle(0, 0, 10, 10)
+        q.add(r1)
+        q.add(r2)
+        self.assertEqual(len(q), 2)
+        self.assertTrue(r1 in q)
+
+        # Rectangles are tracked by identity, not by value
+        q.remove(r1)
+        self.assertEqual(len(q), 1)
+        self.assertFalse(r1 in q)
+        self.assertTrue(r2 in q)
+        self.assertEqual(q.intersecting(Rectangle(5, 5, 1, 1)), [r2])
+
+        q.clear()
+        self.assertEqual(len(q), 0)
+        self.assertEqual(q.intersecting(Rectangle(0, 0, 100, 100)), [])
+
+    def test_intersecting(self):
+        q = QuadTree(0, 0, 100, 100)
+        big = Rectangle(0, 0, 100, 50)
+        small = Rectangle(60, 60, 5, 5)
+        q.add(big)
+        q.add(small)
+
+        self.assertEqual(q.intersecting(Rectangle(10, 10, 5, 5)), [big])
+        self.assertEqual(q.intersecting(Rectangle(62, 62, 1, 1)), [small])
+        self.assertEqual(q.intersecting(Rectangle(10, 70, 5, 5)), [])
+
+        # Touching by the edges isn't an intersection
+        self.assertEqual(q.intersecting(Rectangle(0, 50, 60, 10)), [])
+        self.assertEqual(q.intersecting(Rectangle(65, 60, 5, 5)), [])
+
+        # Rectangles outside the indexed region are still found
+        outside = Rectangle(90, 90, 20, 20)
+        q.add(outside)
+        self.assertEqual(q.intersecting(Rectangle(105, 105, 1, 1)), [outside])
+
+    def test_intersecting_random(self):
+        # Compare against brute force search
+        rng = random.Random(0)
+        q = QuadTree(0, 0, 500, 500)
+        rects = []
+        for _ in range(300):
+            x, y = rng.randint(0, 490), rng.randint(0, 490)
+            r = Rectangle(x, y, rng.randint(1, 500-x), rng.randint(1, 500-y))
+            rects.append(r)
+            q.add(r)
+
+        for r in rects[::2]:
+            q.remove(r)
+        rects = rects[1::2]
+
+        for _ in range(100):
+            x, y = rng.randint(0, 490), rng.randint(0, 490)
+            query = Rectangle(x, y, rng.randint(1, 50), rng.randint(1, 50))
+            expected = set(id(r) for r in rects if r.intersects(query))
+            found = set(id(r) for r in q.intersecting(query))
+            self.assertEqual(found, expected)
+
+    def test_containing_within(self):
+        q = QuadTree(0, 0, 100, 100)
+        outer = Rectangle(0, 0, 100, 60)
+        middle = Rectangle(10, 10, 40, 40)
+        inner = Rectangle(20, 20, 5, 5)
+        other = Rectangle(70, 70, 10, 10)
+        for r in (outer, middle, inner, other):
+            q.add(r)
+
+        self.assertEqual(set(map(id, q.containing(inner))),
+                set(map(id, [outer, middle, inner])))
+        self.assertEqual(q.containing(Rectangle(60, 60, 30, 30)), [])
+        self.assertEqual(set(map(id, q.within(middle))),
+                set(map(id, [middle, inner])))
+        self.assertEqual(set(map(id, q.within(Rectangle(0, 0, 100, 100)))),
+                set(map(id, [outer, middle, inner, other])))
+
+        # Querying doesn't create new nodes
+        q.containing(Rectangle(90, 1, 1, 1))
+        q.within(Rectangle(90, 1, 1, 1))
+        self.assertEqual(len(q), 4)
+
+
+class TestSizeIndex(TestCase):
+
+    def test_containing(self):
+        s = SizeIndex()
+        wide = Rectangle(0, 0, 100, 10)
+        tall = Rectangle(0, 0, 10, 100)
+        big = Rectangle(0, 0, 50, 50)
+        for r in (wide, tall, big):
+            s.add(r)
+        self.assertEqual(len(s), 3)
+
+        self.assertEqual(s.containing(60, 5), [wide])
+        self.assertEqual(s.containing(5, 60), [tall])
+        self.assertEqual(set(map(id, s.containing(10, 10))),
+                set(map(id, [wide, tall, big])))
+        self.assertEqual(s.containing(60, 60), [])
+
+        s.remove(big)
+        self.assertEqual(len(s), 2)
+        self.assertEqual(s.containing(20, 20), [])
+
+    def test_max(self):
+        s = SizeIndex()
+        self.assertEqual((s.max_width(), s.max_height(), s.max_area()), (0, 0, 0))
+
+        wide = Rectangle(0, 0, 100, 10)
+        tall = Rectangle(0, 0, 10, 90)
+        big = Rectangle(0, 0, 50, 50)
+        for r in (wide, tall, big):
+            s.add(r)
+        self.assertEqual((s.max_width(), s.max_height(), s.max_area()),
+                (100, 90, 2500))
+
+        s.remove(big)
+        s.remove(wide)
+        self.assertEqual((s.max_width(), s.max_height(), s.max_area()),
+                (10, 90, 900))
+
+    def test_same_size(self):
+        # Rectangles with the same size are tracked by identity
+        s = SizeIndex()
+        r1 = Rectangle(0, 0, 10, 10)
+        r2 = Rectangle(0, 0, 10, 10)
+        s.add(r1)
+        s.add(r2)
+        s.remove(r2)
+        self.assertEqual(len(s), 1)
+        self.assertTrue(s.containing(10, 10)[0] is r1)
+
+        s.clear()
+        self.assertEqual(len(s), 0)
+
+
+class TestExactSizeIndex(TestCase):
+
+    def test_get(self):
+        s = ExactSizeIndex()
+        r1 = Rectangle(0, 0, 10, 20)
+        r2 = Rectangle(50, 50, 10, 20)
+        r3 = Rectangle(0, 0, 20, 10)
+        for r in (r1, r2, r3):
+            s.add(r)
+        self.assertEqual(len(s), 3)
+
+        # Returned in the order they were added
+        self.assertTrue(s.get(10, 20)[0] is r1)
+        self.assertTrue(s.get(10, 20)[1] is r2)
+        self.assertEqual(s.get(20, 10), [r3])
+        self.assertEqual(s.get(10, 10), [])
+
+        s.remove(r1)
+        s.remove(r3)
+        self.assertEqual(len(s), 1)
+        self.assertTrue(s.get(10, 20)[0] is r2)
+        self.assertEqual(s.get(20, 10), [])
+
+        s.clear()
+        self.assertEqual(len(s), 0)
+        self.assertEqual(s.get(10, 20), [])
+
+
+
+class TestCapacityTree(TestCase):
+
+    def test_first(self):
+        t = CapacityTree()
+        self.assertEqual(t.first(1, 1), None)
+
+        t.append((10, 50, 500))
+        t.append((50, 10, 500))
+        t.append((40, 40, 1600))
+        self.assertEqual(len(t), 3)
+        self.assertEqual(t.first(30, 30), 2)
+        self.assertEqual(t.first(45, 5, rot=False), 1)
+        self.assertEqual(t.first(45, 5, rot=True, start=2), None)
+        self.assertEqual(t.first(5, 45, rot=False), 0)
+        self.assertEqual(t.first(45, 5, rot=True), 0)
+
+        # Area is also tested
+        self.assertEqual(t.first(10, 50, rot=False), 0)
+        t.update(0, (10, 50, 400))
+        self.assertEqual(t.first(10, 50, rot=False), None)
+        t.clear()
+        self.assertEqual(t.first(1, 1), None)
+
+    def test_first_random(self):
+        random.seed(21)
+        t = CapacityTree()
+        capacities = []
+        for _ in range(200):
+            c = (random.randint(0, 50), random.randint(0, 50), 0)
+            c = (c[0], c[1], c[0]*c[1]-random.randint(0, 100))
+            if random.random() < 0.3 and capacities:
+                i = random.randrange(len(capacities))
+                capacities[i] = c
+                t.update(i, c)
+            else:
+                capacities.append(c)
+                t.append(c)
+
+            w, h = random.randint(1, 50), random.randint(1, 50)
+            start = random.randint(0, len(capacities))
+            rot = random.random() < 0.5
+            expected = next((i for i, c in enumerate(capacities) if i >= start
+                and CapacityTree._may_fit(c, w, h, rot)), None)
+            self.assertEqual(t.first(w, h, rot, start), expected)
@@ -1,4 +1,5 @@
 from unittest import TestCase
+import random
 from rectpack.geometry import Rectangle, Point
 import rectpack.maxrects as maxrects
 
@@ -64,6 +65,53 @@ class TestMaxRects(TestCase):
         m._remove_duplicates()
         self.assertEqual(len(m._max_rects), 1)
         
+    def test_remove_contained(self):
+        # Splits must leave the same max_rects as replacing every max_rect
+        # intersecting the rectangle with all its splits, and then pruning
+        # them with the all-pairs _remove_duplicates.
+        rng = random.Random(3)
+        m = maxrects.MaxRectsBssf(300, 300)
+        for _ in range(150):
+            rect = m.select_best_position(rng.randint(1, 40), rng.randint(1, 40))
+            if rect is None:
+                continue
+            expected = []
+            for mr in m._max_rects:
+                if mr.x < rect.right and mr.right > rect.x and \
+                        mr.y < rect.top and mr.top > rect.y:
+                    expected.extend(Rectangle(*s)
+                        for s in m._generate_splits(mr, rect))
+                else:
+                    expected.append(mr)
+
+            m._split(rect)
+            pruned = list(m._max_rects)
+            self.assertEqual(len(m._free_index), len(pruned))
+
+            reference = maxrects.MaxRectsBssf(300, 300)
+            reference._max_rects = expected
+            reference._remove_duplicates()
+            self.assertEqual(reference._max_rects, pruned)
+
+    def test_renumber(self):
+        # Ranks are renumbered when there is no room between two max_rects
+        # for their splits, results must not change.
+        def pack(gap):
+            default, maxrects._RANK_GAP = maxrects._RANK_GAP, gap
+            try:
+                rng = random.Random(5)
+                m = maxrects.MaxRectsBaf(200, 200)
+                for _ in range(120):
+                    m.add_rect(rng.randint(1, 30), rng.randint(1, 30))
+            finally:
+                maxrects._RANK_GAP = default
+            ranks = [m._max_rects_order()[id(mr)] for mr in m._max_rects]
+            self.assertEqual(ranks, sorted(ranks))
+            self.assertEqual(ranks, m._free_ranks)
+            return m.rect_list(), list(m._max_rects)
+
+        self.assertEqual(pack(4), pack(maxrects._RANK_GAP))
+
     def test_iter(self):
         m = maxrects.MaxRects(100, 100)
         self.assertTrue(m.add_rect(10, 15))
@@ -84,6 +132,54 @@ class TestMaxRects(TestCase):
         self.assertEqual(mr.fitness(200, 100), 0)
         self.assertEqual(m.fitness(100, 100), 0)
 
+    def test_fitness_many(self):
+        m = maxrects.MaxRectsBssf(100, 200, rot=True)
+        m.add_rect(30, 30)
+        sizes = [(200, 100), (100, 200), (30, 30), (70, 10), (10, 70), (101, 101)]
+        self.assertEqual(m.fitness_many(sizes),
+                [m.fitness(w, h) for w, h in sizes])
+        self.assertEqual(m.fitness_many(sizes)[-1], None)
+
+    def test_capacity(self):
+        m = maxrects.MaxRectsBssf(100, 200, rot=False)
+        self.assertEqual(m.capacity(), (100, 200, 20000))
+        m.add_rect(60, 200)
+        self.assertEqual(m.capacity(), (40, 200, 8000))
+
+        # Rejected without searching
+        m._select_position = None
+        self.assertEqual(m.fitness(50, 10), None)
+        self.assertEqual(m.add_rect(50, 10), None)
+        self.assertEqual(len(m), 1)
+
+        m = maxrects.MaxRectsBssf(100, 200, rot=True)
+        m.add_rect(100, 150)
+        self.assertEqual(m.capacity(), (100, 50, 5000))
+        self.assertEqual(m.add_rect(40, 60), Rectangle(0, 150, 60, 40))
+        self.assertEqual(m.fitness(45, 50), None)
+
+    def test_placement_cache(self):
+        m = maxrects.MaxRectsBssf(100, 100)
+        m.add_rect(30, 40)
+        m.fitness(20, 20)
+        placement = m._cached_placement(20, 20)
+        self.assertEqual(placement[0], Rectangle(0, 40, 20, 20))
+        self.assertEqual(m._cached_placement(20, 30), None)
+
+        # add_rect reuses the position found by fitness
+        search = m._select_position
+        m._select_position = None
+        rect = m.add_rect(20, 20, rid=3)
+        self.assertTrue(rect is placement[0])
+        self.assertEqual(rect.rid, 3)
+
+        # Any change to the max_rects invalidates it
+        m._select_position = search
+        m.fitness(10, 10)
+        m.place_rect(10, 10, 80, 80)
+        self.assertEqual(m._cached_placement(10, 10), None)
+        self.assertEqual(m.add_rect(10, 10), Rectangle(90, 0, 10, 10))
+
     def test_split(self):
         m = maxrects.MaxRects(100, 100)
         m.add_rect(20, 20)
@@ -91,11 +187,29 @@ class TestMaxRects(TestCase):
         self.assertTrue(Rectangle(0, 20, 100, 80) in m._max_rects)
         self.assertEqual(len(m._max_rects), 2)
 
+        # Splits contained by another max_rect are discarded
         m._split(Rectangle(20, 20, 20, 20))
-        self.assertEqual(len(m._max_rects), 6)
+        self.assertEqual(len(m._max_rects), 4)
         m._remove_duplicates()
         self.assertEqual(len(m._max_rects), 4)
 
+    def test_split_in_place(self):
+        # Splits replace their max_rect in the same list, keeping its position
+        m = maxrects.MaxRects(100, 100)
+        m._max_rects = [Rectangle(0, 0, 10, 10), Rectangle(20, 0, 80, 100),
+            Rectangle(0, 50, 10, 10)]
+        max_rects = m._max_rects
+
+        splits = m._split(Rectangle(40, 40, 20, 20))
+        self.assertTrue(m._max_rects is max_rects)
+        self.assertEqual(m._max_rects, [Rectangle(0, 0, 10, 10)] + splits +
+            [Rectangle(0, 50, 10, 10)])
+
+        m._compact([splits[0], m._max_rects[-1]])
+        self.assertTrue(m._max_rects is max_rects)
+        self.assertEqual(m._max_rects, [Rectangle(0, 0, 10, 10)] + splits[1:])
+        self.assertEqual(len(m._free_index), len(m._max_rects))
+
     def test_generate_splits(self):
         m = maxrects.MaxRects(40, 40)
         mr = Rectangle(20, 20, 40, 40)
@@ -110,120 +224,120 @@ class TestMaxRects(TestCase):
 
         # Center
         rects = m._generate_splits(mr, Rectangle(30, 30, 10, 10))
-        self.assertTrue(Rectangle(20, 20, 10, 40) in rects) # Left
-        self.assertTrue(Rectangle(20, 20, 40, 10) in rects) # Bottom
-        self.assertTrue(Rectangle(40, 20, 20, 40) in rects) # Right
-        self.assertTrue(Rectangle(20, 40, 40, 20) in rects) # Top
+        self.assertTrue((20, 20, 10, 40) in rects) # Left
+        self.assertTrue((20, 20, 40, 10) in rects) # Bottom
+        self.assertTrue((40, 20, 20, 40) in rects) # Right
+        self.assertTrue((20, 40, 40, 20) in rects) # Top
         self.assertEqual(len(rects), 4)
 
         # Top - Center
         rects = m._generate_splits(mr, Rectangle(30, 30, 10, 30))
-        self.assertTrue(Rectangle(20, 20, 40, 10) in rects) # Bottom
-        self.assertTrue(Rectangle(20, 20, 10, 40) in rects) # Left
-        self.assertTrue(Rectangle(40, 20, 20, 40) in rects) # Right
+        self.assertTrue((20, 20, 40, 10) in rects) # Bottom
+        self.assertTrue((20, 20, 10, 40) in rects) # Left
+        self.assertTrue((40, 20, 20, 40) in rects) # Right
         self.assertEqual(len(rects), 3)
  
         rects = m._generate_splits(mr, Rectangle(30, 30, 10, 100))
-        self.assertTrue(Rectangle(20, 20, 40, 10) in rects) # Bottom
-        self.assertTrue(Rectangle(20, 20, 10, 40) in rects) # Left
-        self.assertTrue(Rectangle(40, 20, 20, 40) in rects) # Right
+        self.assertTrue((20, 20, 40, 10) in rects) # Bottom
+        self.assertTrue((20, 20, 10, 40) in rects) # Left
+        self.assertTrue((40, 20, 20, 40) in rects) # Right
         self.assertEqual(len(rects), 3)
 
         # Bottom - Center
         rects = m._generate_splits(mr, Rectangle(30, 20, 10, 10))
-        self.assertTrue(Rectangle(20, 30, 40, 30) in rects) # Top
-        self.assertTrue(Rectangle(20, 20, 10, 40) in rects) # Left
-        self.assertTrue(Rectangle(40, 20, 20, 40) in rects) # Right
+        self.assertTrue((20, 30, 40, 30) in rects) # Top
+        self.assertTrue((20, 20, 10, 40) in rects) # Left
+        self.assertTrue((40, 20, 20, 40) in rects) # Right
         self.assertEqual(len(rects), 3)
         
         rects = m._generate_splits(mr, Rectangle(30, 0, 10, 30))
-        self.assertTrue(Rectangle(20, 30, 40, 30) in rects) # Top
-        self.assertTrue(Rectangle(20, 20, 10, 40) in rects) # Left
-        self.assertTrue(Rectangle(40, 20, 20, 40) in rects) # Right
+        self.assertTrue((20, 30, 40, 30) in rects) # Top
+        self.assertTrue((20, 20, 10, 40) in rects) # Left
+        self.assertTrue((40, 20, 20, 40) in rects) # Right
         self.assertEqual(len(rects), 3)
 
         # Left - Center
         rects = m._generate_splits(mr, Rectangle(20, 30, 20, 10))
-        self.assertTrue(Rectangle(20, 40, 40, 20) in rects) # Top
-        self.assertTrue(Rectangle(20, 20, 40, 10) in rects) # Bottom
-        self.assertTrue(Rectangle(40, 20, 20, 40) in rects) # Right
+        self.assertTrue((20, 40, 40, 20) in rects) # Top
+        self.assertTrue((20, 20, 40, 10) in rects) # Bottom
+        self.assertTrue((40, 20, 20, 40) in rects) # Right
         self.assertEqual(len(rects), 3)
         
         rects = m._generate_splits(mr, Rectangle(0, 30, 40, 10))
-        self.assertTrue(Rectangle(20, 40, 40, 20) in rects) # Top
-        self.assertTrue(Rectangle(20, 20, 40, 10) in rects) # Bottom
-        self.assertTrue(Rectangle(40, 20, 20, 40) in rects) # Right
+        self.assertTrue((20, 40, 40, 20) in rects) # Top
+        self.assertTrue((20, 20, 40, 10) in rects) # Bottom
+        self.assertTrue((40, 20, 20, 40) in rects) # Right
         self.assertEqual(len(rects), 3)
 
         # Right - Center
         rects = m._generate_splits(mr, Rectangle(40, 30, 20, 20))
-        self.assertTrue(Rectangle(20, 50, 40, 10) in rects) # Top
-        self.assertTrue(Rectangle(20, 20, 40, 10) in rects) # Bottom
-        self.assertTrue(Rectangle(20, 20, 20, 40) in rects) # Left
+        self.assertTrue((20, 50, 40, 10) in rects) # Top
+        self.assertTrue((20, 20, 40, 10) in rects) # Bottom
+        self.assertTrue((20, 20, 20, 40) in rects) # Left
         self.assertEqual(len(rects), 3)
 
         rects = m._generate_splits(mr, Rectangle(40, 30, 90, 20))
-        self.assertTrue(Rectangle(20, 50, 40, 10) in rects) # Top
-        self.assertTrue(Rectangle(20, 20, 40, 10) in rects) # Bottom
-        self.assertTrue(Rectangle(20, 20, 20, 40) in rects) # Left
+        self.assertTrue((20, 50, 40, 10) in rects) # Top
+        self.assertTrue((20, 20, 40, 10) in rects) # Bottom
+        self.assertTrue((20, 20, 20, 40) in rects) # Left
         self.assertEqual(len(rects), 3)
 
         # Top - Right
         rects = m._generate_splits(mr, Rectangle(40, 40, 20, 20))
-        self.assertTrue(Rectangle(20, 20, 20, 40) in rects) # Left
-        self.assertTrue(Rectangle(20, 20, 40, 20) in rects) # Bottom
+        self.assertTrue((20, 20, 20, 40) in rects) # Left
+        self.assertTrue((20, 20, 40, 20) in rects) # Bottom
         self.assertEqual(len(rects), 2)
         
         rects = m._generate_splits(mr, Rectangle(40, 40, 30, 30))
-        self.assertTrue(Rectangle(20, 20, 20, 40) in rects) # Left
-        self.assertTrue(Rectangle(20, 20, 40, 20) in rects) # Bottom
+        self.assertTrue((20, 20, 20, 40) in rects) # Left
+        self.assertTrue((20, 20, 40, 20) in rects) # Bottom
         self.assertEqual(len(rects), 2)
         
         # Bottom - Left 
         rects = m._generate_splits(mr, Rectangle(20, 20, 20, 20))
-        self.assertTrue(Rectangle(20, 40, 40, 20) in rects) # Top
-        self.assertTrue(Rectangle(40, 20, 20, 40) in rects) # Right
+        self.assertTrue((20, 40, 40, 20) in rects) # Top
+        self.assertTrue((40, 20, 20, 40) in rects) # Right
         self.assertEqual(len(rects), 2)
         
         rects = m._generate_splits(mr, Rectangle(10, 10, 30, 30))
-        self.assertTrue(Rectangle(20, 40, 40, 20) in rects) # Top
-        self.assertTrue(Rectangle(40, 20, 20, 40) in rects) # Right
+        self.assertTrue((20, 40, 40, 20) in rects) # Top
+        self.assertTrue((40, 20, 20, 40) in rects) # Right
         self.assertEqual(len(rects), 2)
 
         # Top - Full
         rects = m._generate_splits(mr, Rectangle(20, 40, 40, 20))
-        self.assertTrue(Rectangle(20, 20, 40, 20) in rects)
+        self.assertTrue((20, 20, 40, 20) in rects)
         self.assertEqual(len(rects), 1)
         
         rects = m._generate_splits(mr, Rectangle(10, 40, 60, 60))
-        self.assertTrue(Rectangle(20, 20, 40, 20) in rects)
+        self.assertTrue((20, 20, 40, 20) in rects)
         self.assertEqual(len(rects), 1)
 
         # Bottom - Full
         rects = m._generate_splits(mr, Rectangle(20, 20, 40, 20))
-        self.assertTrue(Rectangle(20, 40, 40, 20) in rects)
+        self.assertTrue((20, 40, 40, 20) in rects)
         self.assertEqual(len(rects), 1)
 
         rects = m._generate_splits(mr, Rectangle(10, 10, 50, 30))
-        self.assertTrue(Rectangle(20, 40, 40, 20) in rects)
+        self.assertTrue((20, 40, 40, 20) in rects)
         self.assertEqual(len(rects), 1)
         
         # Right - Full
         rects = m._generate_splits(mr, Rectangle(40, 20, 20, 40))
-        self.assertTrue(Rectangle(20, 20, 20, 40) in rects)
+        self.assertTrue((20, 20, 20, 40) in rects)
         self.assertEqual(len(rects), 1)
 
         rects = m._generate_splits(mr, Rectangle(40, 10, 30, 60))
-        self.assertTrue(Rectangle(20, 20, 20, 40) in rects)
+        self.assertTrue((20, 20, 20, 40) in rects)
         self.assertEqual(len(rects), 1)
         
         # Left - Full
         rects = m._generate_splits(mr, Rectangle(20, 20, 20, 40))
-        self.assertTrue(Rectangle(40, 20, 20, 40) in rects)
+        self.assertTrue((40, 20, 20, 40) in rects)
         self.assertEqual(len(rects), 1)
 
         rects = m._generate_splits(mr, Rectangle(10, 10, 30, 60))
-        self.assertTrue(Rectangle(40, 20, 20, 40) in rects)
+        self.assertTrue((40, 20, 20, 40) in rects)
         self.assertEqual(len(rects), 1)
 
     def test_getitem(self):
@@ -262,6 +376,27 @@ class TestMaxRectBAF(TestCase):
         self.assertTrue(m.fitness(40, 40) < m.fitness(35, 35))
         self.assertEqual(m.add_rect(40, 40), Rectangle(60, 0, 40, 40))
 
+    def test_exact_fit(self):
+        m = maxrects.MaxRectsBaf(100, 100)
+        m._max_rects = [Rectangle(0, 0, 50, 50), Rectangle(70, 0, 30, 20),
+            Rectangle(50, 30, 20, 30), Rectangle(50, 0, 20, 30)]
+
+        # First perfect fit in max_rects, normal orientation before rotated
+        self.assertEqual(m.select_best_position(20, 30), Rectangle(50, 30, 20, 30))
+        self.assertEqual(m.select_best_position(30, 20), Rectangle(70, 0, 30, 20))
+        m._max_rects = m._max_rects[:1] + m._max_rects[2:]
+        self.assertEqual(m.select_best_position(30, 20), Rectangle(50, 30, 20, 30))
+
+        # Same selection as scanning all the max_rects
+        rng = random.Random(3)
+        sizes = [(10, 20), (20, 10), (15, 15), (5, 30)]
+        m1 = maxrects.MaxRectsBaf(100, 100)
+        m2 = maxrects.MaxRectsBaf(100, 100)
+        m2._exact_fit_first = False
+        for _ in range(100):
+            w, h = rng.choice(sizes)
+            self.assertEqual(m1.add_rect(w, h), m2.add_rect(w, h))
+
 class TestMaxRectBLSF(TestCase):
     
     def test_rect_fitnesss(self):
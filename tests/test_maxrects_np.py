@@ -0,0 +1,122 @@
+from unittest import TestCase, SkipTest
+import random
+from rectpack.geometry import Rectangle
+import rectpack.maxrects as maxrects
+from rectpack.packer import newPacker, PackingBin
+
+try:
+    import rectpack.maxrects_np as maxrects_np
+except ImportError:
+    raise SkipTest("NumPy not installed")
+
+
+class TestMaxRectsNp(TestCase):
+
+    def test_init(self):
+        m = maxrects_np.MaxRectsNp(20, 50)
+        self.assertEqual(m._max_rects, [Rectangle(0, 0, 20, 50)])
+
+        m.add_rect(5, 5)
+        m.reset()
+        self.assertEqual(len(m), 0)
+        self.assertEqual(m._max_rects, [Rectangle(0, 0, 20, 50)])
+
+    def test_add_rect(self):
+        m = maxrects_np.MaxRectsNp(200, 100)
+        self.assertEqual(m.add_rect(50, 30), Rectangle(0, 0, 50, 30))
+        self.assertEqual(len(m._max_rects), 2)
+        self.assertEqual(m.add_rect(70, 200), Rectangle(0, 30, 200, 70))
+        self.assertEqual(len(m._max_rects), 1)
+        self.assertEqual(m.add_rect(20, 20), Rectangle(50, 0, 20, 20))
+        self.assertEqual(m.add_rect(50, 50), None)
+        self.assertEqual(m.add_rect(30, 100), Rectangle(70, 0, 100, 30))
+
+        m = maxrects_np.MaxRectsNp(200, 50, rot=False)
+        self.assertEqual(m.add_rect(40, 80), None)
+
+        # Coordinates are returned as python numbers
+        m = maxrects_np.MaxRectsNp(200, 50)
+        rect = m.add_rect(40, 80)
+        self.assertEqual(rect, Rectangle(0, 0, 80, 40))
+        self.assertTrue(type(rect.x) is int)
+
+    def test_float(self):
+        m = maxrects_np.MaxRectsBssfNp(100, 100)
+        self.assertEqual(m.add_rect(10, 10), Rectangle(0, 0, 10, 10))
+        self.assertEqual(m.add_rect(10.5, 10), Rectangle(10, 0, 10.5, 10))
+        self.assertEqual(m.add_rect(10, 10), Rectangle(20.5, 0, 10, 10))
+
+    def test_remove_duplicates(self):
+        m = maxrects_np.MaxRectsNp(100, 100)
+        rect1 = Rectangle(0, 0, 60, 40)
+        rect2 = Rectangle(30, 20, 60, 40)
+        rect3 = Rectangle(35, 25, 10, 10)
+        rect4 = Rectangle(90, 90, 10, 10)
+        m._max_rects = [rect1, rect2, rect3, rect4]
+
+        m._remove_duplicates()
+        self.assertEqual(m._max_rects, [rect1, rect2, rect4])
+
+    def test_same_as_maxrects(self):
+        # Vectorized variants must return the same placements and fitness
+        variants = [
+            (maxrects.MaxRects, maxrects_np.MaxRectsNp),
+            (maxrects.MaxRectsBl, maxrects_np.MaxRectsBlNp),
+            (maxrects.MaxRectsBssf, maxrects_np.MaxRectsBssfNp),
+            (maxrects.MaxRectsBaf, maxrects_np.MaxRectsBafNp),
+            (maxrects.MaxRectsBlsf, maxrects_np.MaxRectsBlsfNp)]
+
+        for algo, algo_np in variants:
+            for rot in (True, False):
+                rng = random.Random(1)
+                m, mnp = algo(200, 150, rot=rot), algo_np(200, 150, rot=rot)
+                for _ in range(150):
+                    w, h = rng.randint(1, 40), rng.randint(1, 40)
+                    self.assertEqual(m.fitness(w, h), mnp.fitness(w, h))
+                    self.assertEqual(m.add_rect(w, h), mnp.add_rect(w, h))
+                self.assertEqual(m._max_rects, mnp._max_rects)
+
+    def test_fitness_many(self):
+        for algo in (maxrects_np.MaxRectsBlNp, maxrects_np.MaxRectsBafNp):
+            m = algo(100, 100)
+            m.add_rect(60, 30)
+            m.add_rect(20, 50)
+            sizes = [(10, 10), (40, 70), (70, 40), (80, 80), (20, 10.5)]
+            self.assertEqual(m.fitness_many(sizes),
+                    [m.fitness(w, h) for w, h in sizes])
+            self.assertEqual(m.fitness_many([]), [])
+
+            # Any iterable of sizes
+            self.assertEqual(m.fitness_many(iter(sizes)),
+                    [m.fitness(w, h) for w, h in sizes])
+
+    def test_packer(self):
+        p = newPacker(pack_algo=maxrects_np.MaxRectsBssfNp)
+        p.add_bin(100, 100)
+        for _ in range(4):
+            p.add_rect(50, 50)
+        p.pack()
+        p.validate_packing()
+        self.assertEqual(len(p[0]), 4)
+
+    def test_packer_global(self):
+        # Global packing scores every remaining rectangle with fitness_many
+        variants = [
+            (maxrects.MaxRectsBl, maxrects_np.MaxRectsBlNp),
+            (maxrects.MaxRectsBssf, maxrects_np.MaxRectsBssfNp),
+            (maxrects.MaxRectsBaf, maxrects_np.MaxRectsBafNp),
+            (maxrects.MaxRectsBlsf, maxrects_np.MaxRectsBlsfNp)]
+
+        rng = random.Random(3)
+        rects = [(rng.randint(5, 50), rng.randint(5, 50)) for _ in range(40)]
+        for algo, algo_np in variants:
+            packers = []
+            for pack_algo in (algo, algo_np):
+                p = newPacker(bin_algo=PackingBin.Global, pack_algo=pack_algo)
+                p.add_bin(100, 100, count=10)
+                for r in rects:
+                    p.add_rect(*r)
+                p.pack()
+                p.validate_packing()
+                packers.append(p)
+            self.assertEqual(packers[0].rect_list(), packers[1].rect_list())
@@ -1,4 +1,6 @@
 from unittest import TestCase
+import random
+import array
 from rectpack.geometry import Rectangle
 import rectpack.skyline as skyline
 import rectpack.guillotine as guillotine
@@ -472,6 +474,262 @@ class TestPackerOnlineBBF(TestCase):
             if width==20:
                 self.assertEqual(bin, 100)
 
+    def test_region_index(self):
+        # Bin found with the free region index is the same as asking every
+        # bin for its fitness, also mixing bins without free regions.
+        class SomeWithoutRegions(maxrects.MaxRectsBaf):
+            def __init__(self, width, height, *args, **kwargs):
+                super(SomeWithoutRegions, self).__init__(width, height, *args, **kwargs)
+                if width == 40:
+                    self._free_regions = lambda: None
+
+        random.seed(22)
+        p = packer.PackerOnlineBBF(pack_algo=SomeWithoutRegions)
+        p.add_bin(40, 40, count=3)
+        p.add_bin(60, 50, count=float("inf"))
+        for _ in range(200):
+            w, h = random.randint(1, 30), random.randint(1, 30)
+            index = p._open_regions()
+            fit = [(b.fitness(w, h), i) for i, b in enumerate(p._open_bins)]
+            fit = [f for f in fit if f[0] is not None]
+            best = p._open_bins[min(fit)[1]] if fit else None
+            self.assertIs(index.best_bin(w, h), best)
+            p.add_rect(w, h)
+
+
+class TestOpenBinsLimit(TestCase):
+
+    def test_max_open_bins(self):
+        for bin_algo in (packer.PackingBin.BFF, packer.PackingBin.BBF):
+            p = packer.newPacker(mode=packer.PackingMode.Online,
+                bin_algo=bin_algo, pack_algo=guillotine.GuillotineBafSas,
+                rotation=False, max_open_bins=2)
+            p.add_bin(100, 100, count=float("inf"))
+
+            p.add_rect(90, 90)
+            p.add_rect(80, 80)
+            p.add_rect(15, 15) # Only fits in the second bin
+            self.assertEqual(len(p._open_bins), 2)
+
+            # The least recently used bin is closed to open a new one
+            p.add_rect(70, 70)
+            self.assertEqual(len(p._open_bins), 2)
+            self.assertEqual(len(p._closed_bins), 1)
+            self.assertEqual(len(p), 3)
+            self.assertEqual(len(p[0]), 1)
+            self.assertEqual(p[0].rectangles[0].width, 90)
+
+            # Closed bins aren't used anymore
+            p.add_rect(8, 8)
+            self.assertEqual(len(p[0]), 1)
+            self.assertEqual(len(p), 3)
+
+    def test_close_ratio(self):
+        for bin_algo in (packer.PackingBin.BFF, packer.PackingBin.BBF):
+            p = packer.newPacker(mode=packer.PackingMode.Online,
+                bin_algo=bin_algo, rotation=False, close_ratio=0.8)
+            p.add_bin(100, 100, count=float("inf"))
+
+            p.add_rect(100, 70)
+            p.add_rect(50, 10)
+            self.assertEqual(len(p._open_bins), 1)
+            self.assertEqual(len(p._closed_bins), 0)
+
+            p.add_rect(50, 10)
+            self.assertEqual(len(p._open_bins), 0)
+            self.assertEqual(len(p._closed_bins), 1)
+
+            # It fits in the closed bin, but a new one is opened
+            p.add_rect(10, 10)
+            self.assertEqual(len(p), 2)
+            self.assertEqual(len(p[1]), 1)
+
+    def test_invalid(self):
+        for kwargs in ({'max_open_bins': 0}, {'close_ratio': 0}, 
+                {'close_ratio': 1.5}):
+            with self.assertRaises(ValueError):
+                packer.PackerOnlineBFF(**kwargs)
+            with self.assertRaises(ValueError):
+                packer.newPacker(bin_algo=packer.PackingBin.BBF, **kwargs)
+
+        # Only supported by BFF and BBF
+        for mode, bin_algo in ((packer.PackingMode.Offline, packer.PackingBin.Global),
+                (packer.PackingMode.Offline, packer.PackingBin.BNF),
+                (packer.PackingMode.Online, packer.PackingBin.BNF)):
+            with self.assertRaises(ValueError):
+                packer.newPacker(mode=mode, bin_algo=bin_algo, close_ratio=0.5)
+            with self.assertRaises(ValueError):
+                packer.newPacker(mode=mode, bin_algo=bin_algo, max_open_bins=2)
+
+        p = packer.newPacker(bin_algo=packer.PackingBin.BFF, max_open_bins=1,
+                close_ratio=1)
+        self.assertEqual(p._max_open_bins, 1)
+
+    def test_offline(self):
+        p = packer.PackerBFF(max_open_bins=1)
+        p.add_bin(50, 50, count=10)
+        for r in [(40, 40), (40, 40), (5, 5)]:
+            p.add_rect(*r)
+        p.pack()
+        self.assertEqual(len(p), 2)
+
+        # Same as BNF here
+        q = packer.PackerBNF()
+        q.add_bin(50, 50, count=10)
+        for r in [(40, 40), (40, 40), (5, 5)]:
+            q.add_rect(*r)
+        q.pack()
+        self.assertEqual(p.rect_list(), q.rect_list())
+
+
+class TestBinFactorySelection(TestCase):
+
+    def test_first_factory(self):
+        # New bins are taken from the first factory the rectangle fits in
+        for rotation in (True, False):
+            p = packer.newPacker(mode=packer.PackingMode.Online,
+                bin_algo=packer.PackingBin.BFF, rotation=rotation)
+            p.add_bin(10, 10)
+            p.add_bin(20, 50, count=0)
+            p.add_bin(20, 50, bid="a")
+            p.add_bin(50, 20, bid="b")
+            p.add_bin(60, 60, bid="c")
+
+            p.add_rect(8, 8)
+            self.assertEqual(p[0].width, 10)
+            p.add_rect(40, 15)
+            self.assertEqual(p[1].bid, "a" if rotation else "b")
+            p.add_rect(40, 15)
+            self.assertEqual(p[2].bid, "b" if rotation else "c")
+            self.assertEqual(p.add_rect(70, 10), None)
+
+    def test_global(self):
+        # Bins where none of the remaining rectangles fit are skipped
+        p = packer.newPacker(bin_algo=packer.PackingBin.Global, rotation=False)
+        p.add_bin(10, 10, bid="a")
+        p.add_bin(30, 15, bid="b")
+        p.add_bin(30, 30, bid="c")
+        p.add_bin(40, 40, bid="d")
+        p.add_rect(20, 20)
+        p.add_rect(25, 25)
+        p.pack()
+        self.assertEqual([b.bid for b in p], ["c", "d"])
+
+
+class TestBulkAdd(TestCase):
+
+    def setUp(self):
+        self.rects = [(30, 40, 1), (52, 52, 2), (20.5, 10, 3), (7, 60, 4),
+            (100, 20, 5), (33, 33, 6)]
+        self.bins = [(50, 50, 2), (100, 100, float("inf"))]
+
+    def _packers(self):
+        for mode, bin_algos in ((packer.PackingMode.Offline, 
+                (packer.PackingBin.BNF, packer.PackingBin.BFF, 
+                    packer.PackingBin.BBF, packer.PackingBin.Global)),
+                (packer.PackingMode.Online, (packer.PackingBin.BNF, 
+                    packer.PackingBin.BFF, packer.PackingBin.BBF))):
+            for bin_algo in bin_algos:
+                yield (packer.newPacker(mode=mode, bin_algo=bin_algo),
+                    packer.newPacker(mode=mode, bin_algo=bin_algo))
+
+    def test_same_as_add_rect(self):
+        widths, heights, rids = zip(*self.rects)
+        for p, q in self._packers():
+            for b in self.bins:
+                p.add_bin(*b)
+            for r in self.rects:
+                p.add_rect(*r)
+
+            q.add_bins(array.array('q', [50, 100]), (50, 100), 
+                    counts=[2, float("inf")])
+            q.add_rects(widths[:2], heights[:2], rids[:2])
+            q.add_rect(*self.rects[2])
+            q.add_rects(iter(widths[3:]), list(heights[3:]), rids[3:])
+
+            if hasattr(p, 'pack'):
+                p.pack()
+                q.pack()
+            self.assertEqual(p.rect_list(), q.rect_list())
+
+    def test_online_return(self):
+        # add_rects returns the same as add_rect, also when bins are closed
+        # while the batch is packed.
+        rand = random.Random(7)
+        rects = [(rand.randint(5, 60), rand.randint(5, 60), i)
+                for i in range(200)]
+        widths, heights, rids = zip(*rects)
+        for bin_algo in (packer.PackingBin.BNF, packer.PackingBin.BFF,
+                packer.PackingBin.BBF):
+            options = [{}]
+            if bin_algo != packer.PackingBin.BNF:
+                options += [{'max_open_bins': 2}, {'close_ratio': 0.6}]
+            for kwargs in options:
+                p = packer.newPacker(mode=packer.PackingMode.Online,
+                        bin_algo=bin_algo, **kwargs)
+                q = packer.newPacker(mode=packer.PackingMode.Online,
+                        bin_algo=bin_algo, **kwargs)
+                p.add_bin(100, 100, count=20)
+                q.add_bin(100, 100, count=20)
+
+                packed = [p.add_rect(*r) for r in rects]
+                self.assertEqual(q.add_rects(widths, heights, rids), packed)
+                self.assertEqual(p.rect_list(), q.rect_list())
+                self.assertEqual(len(p._closed_bins), len(q._closed_bins))
+
+    def test_bin_kwargs(self):
+        # Bins added one at a time keep their arguments and order
+        p = packer.newPacker(pack_algo=guillotine.GuillotineBssfSas)
+        p.add_bins([10, 20], [10, 20], bids=['a', 'b'])
+        p.add_bin(30, 30, bid='c', merge=False)
+        p.add_bin(40, 40)
+        p.add_bins([50], [50], counts=[2])
+        for r in (50, 50, 40, 30, 20, 10):
+            p.add_rect(r, r)
+        p.pack()
+        # Rectangles are sorted by area, each one opens the smallest bin
+        self.assertEqual([(b.width, b.bid) for b in p], [(50, None),
+            (50, None), (40, None), (30, 'c'), (20, 'b'), (10, 'a')])
+        self.assertEqual([b._merge for b in p],
+                [True, True, True, False, True, True])
+
+    def test_numpy(self):
+        try:
+            import numpy as np
+        except ImportError:
+            return
+
+        p = packer.newPacker()
+        p.add_bins(np.array([100]), np.array([100]))
+        p.add_rects(np.array([10, 20]), np.array([30, 40], dtype=np.int32))
+        p.pack()
+        rects = p.rect_list()
+        self.assertEqual(len(rects), 2)
+        for r in rects:
+            self.assertTrue(all(type(v) is int for v in r[:5]))
+
+        # Only one dimensional arrays are accepted
+        for mode in (packer.PackingMode.Offline, packer.PackingMode.Online):
+            p = packer.newPacker(mode=mode)
+            with self.assertRaises(ValueError):
+                p.add_rects(np.array([[10, 20]]), np.array([[30, 40]]))
+            with self.assertRaises(ValueError):
+                p.add_bins(np.array([[100]]), [100])
+            with self.assertRaises(ValueError):
+                p.add_rects(np.array(10), np.array(10))
+        self.assertEqual(len(p._empty_bins), 0)
+
+    def test_length_mismatch(self):
+        p = packer.newPacker()
+        with self.assertRaises(ValueError):
+            p.add_rects([1, 2], [1])
+        with self.assertRaises(ValueError):
+            p.add_rects([1, 2], [1, 2], rids=[1])
+        with self.assertRaises(ValueError):
+            p.add_bins([10], [10, 20])
+        self.assertEqual(len(p._avail_rect), 0)
+        self.assertEqual(len(p._avail_bins), 0)
+
 
 class TestPacker(TestCase):
 
@@ -885,6 +1143,39 @@ class TestPackerGlobal(TestCase):
         self.assertEqual(len(p.rect_list()), 0)
         self.assertEqual(len(p.bin_list()), 0)
 
+    def test_fitness_queue(self):
+        # Algorithms reporting free region changes use a fitness queue,
+        # results must be the same as rescoring every rectangle.
+        def no_regions(algo):
+            return type('NoRegions', (algo,), {'_free_regions': lambda self: None})
+
+        rng = random.Random(7)
+        sizes = [(rng.randint(5, 50), rng.randint(5, 50)) for _ in range(6)]
+        repeated = [rng.choice(sizes) for _ in range(150)]
+        distinct = [(rng.randint(5, 50), rng.randint(5, 50)) for _ in range(150)]
+
+        for algo in (maxrects.MaxRectsBssf, maxrects.MaxRectsBl,
+                guillotine.GuillotineBafSas, guillotine.GuillotineBlsfMinas):
+            for rectangles, rotation in ((repeated, True), (distinct, True),
+                    (distinct, False)):
+                results = []
+                for pack_algo in (algo, no_regions(algo)):
+                    p = packer.PackerGlobal(pack_algo=pack_algo, 
+                            rotation=rotation)
+                    p.add_bin(150, 150, count=20)
+                    for r in rectangles:
+                        p.add_rect(*r)
+                    p.pack()
+                    p.validate_packing()
+                    results.append(p.rect_list())
+
+                self.assertEqual(len(results[0]), len(rectangles))
+                self.assertEqual(results[0], results[1])
+
+        # Listeners are removed from closed bins
+        for b in p:
+            self.assertEqual(b._listeners, [])
+
     def test_bin_selection(self):
         # Test rectangles with better fitness are placed first 
         p = packer.PackerGlobal(pack_algo=skyline.SkylineMwfl, 
@@ -1,4 +1,5 @@
 from unittest import TestCase
+import random
 from rectpack.geometry import Rectangle
 import rectpack.skyline as skyline
 
@@ -23,6 +24,87 @@ class TestSkyline(TestCase):
         rect1 = s.add_rect(10, 100)
         self.assertEqual(rect1, None)
 
+    def test_fitness_many(self):
+        # Same as calling fitness for each size
+        for algo in (skyline.SkylineBl, skyline.SkylineMwfl, skyline.SkylineBlWm):
+            s = algo(100, 100)
+            s.add_rect(30, 30)
+            s.add_rect(100, 50)
+            s.add_rect(10, 70)
+            sizes = [(20, 10), (10, 20), (70, 20), (20, 10), (60, 90), (10, 30)]
+            self.assertEqual(s.fitness_many(sizes),
+                    [s.fitness(w, h) for w, h in sizes])
+            self.assertEqual(s.fitness_many([]), [])
+
+    def test_add_skyline(self):
+        # Only the segments under the rectangle are replaced, the result
+        # must be the same as rebuilding the whole skyline.
+        rng = random.Random(11)
+        s = skyline.SkylineMwfWm(300, 300)
+        for _ in range(200):
+            s.add_rect(rng.randint(1, 30), rng.randint(1, 30))
+
+            segments = s._skyline
+            self.assertEqual(s._skyline_lefts, [seg.left for seg in segments])
+            self.assertEqual(segments[0].left, 0)
+            self.assertEqual(segments[-1].right, 300)
+            for s1, s2 in zip(segments, segments[1:]):
+                self.assertEqual(s1.right, s2.left)
+                self.assertNotEqual(s1.top, s2.top)
+            self.assertEqual(s._skyline_floor(), min(seg.top for seg in segments))
+
+        s.validate_packing()
+
+    def test_support_points(self):
+        # Support height is the highest segment under the rectangle
+        rng = random.Random(5)
+        s = skyline.SkylineBl(200, 400)
+        for _ in range(60):
+            s.add_rect(rng.randint(1, 20), rng.randint(1, 20))
+
+        segments = s._skyline
+        for width in (1, 7, 20, 55, 200):
+            points = s._find_support_points(width)
+            self.assertTrue(points)
+            for p, support, left, right in points:
+                self.assertTrue(segments[left].left <= p < segments[left].right)
+                self.assertTrue(segments[right].left < p+width <= segments[right].right)
+                self.assertEqual(support,
+                    max(seg.top for seg in segments[left:right+1]))
+
+    def test_capacity(self):
+        s = skyline.SkylineBl(100, 100, rot=False)
+        self.assertEqual(s.capacity(), (100, 100, 10000))
+        s.add_rect(50, 40)
+        self.assertEqual(s.capacity(), (100, 100, 10000))
+        s.add_rect(50, 20)
+        self.assertEqual(s.capacity(), (100, 80, 8000))
+        self.assertEqual(s.fitness(10, 90), None)
+        self.assertEqual(s.add_rect(10, 90), None)
+
+        # Wasted sections are included
+        s = skyline.SkylineBlWm(100, 100, rot=False)
+        s.add_rect(50, 40)
+        s.add_rect(100, 60)
+        self.assertEqual(s.capacity(), (100, 40, 2000))
+        self.assertEqual(s.add_rect(50, 40), Rectangle(50, 0, 50, 40))
+        self.assertEqual(s.capacity(), (100, 0, 0))
+
+    def test_placement_cache(self):
+        s = skyline.SkylineBl(100, 100)
+        s.add_rect(30, 40)
+        s.fitness(20, 20)
+        rect, _ = s._cached_placement(20, 20)
+
+        # add_rect reuses the position found by fitness
+        search = s._select_position
+        s._select_position = None
+        self.assertTrue(s.add_rect(20, 20) is rect)
+        self.assertEqual(s._cached_placement(20, 20), None)
+
+        s._select_position = search
+        self.assertEqual(s.add_rect(20, 20), Rectangle(60, 0, 20, 20))
+
     def test_waste_management(self):
         # Generate one wasted section
         s = skyline.SkylineBlWm(100, 100, rot=False)
@@ -523,6 +605,24 @@ class TestSkylineMwf(TestCase):
 
         self.assertTrue(p.fitness(90, 10) < p.fitness(100, 10))
 
+    def test_wasted_area(self):
+        # Prefix sums give the same waste as adding every segment
+        def waste(s, rect, left, right):
+            return sum((min(rect.right, seg.right)-max(rect.left, seg.left)) *
+                (rect.bottom-seg.top) for seg in s._skyline[left:right+1])
+
+        rng = random.Random(2)
+        for scale in (1, 0.5):
+            p = skyline.SkylineMwf(300, 300)
+            for _ in range(40):
+                p.add_rect(rng.randint(1, 30)*scale, rng.randint(1, 30)*scale)
+            self.assertEqual(p._skyline_sums() is None, scale != 1)
+
+            for width in (1, 13, 40):
+                for rect, left, right in p._generate_placements(width, 10):
+                    self.assertEqual(p._wasted_area(rect, left, right),
+                            waste(p, rect, left, right))
+
     def test_skyline(self):
         """
         +---------------------------+
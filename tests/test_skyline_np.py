@@ -0,0 +1,90 @@
+from unittest import TestCase, SkipTest
+import random
+from rectpack.geometry import Rectangle, Point as P, HSegment
+import rectpack.skyline as skyline
+from rectpack.packer import newPacker, PackingBin
+
+try:
+    import rectpack.skyline_np as skyline_np
+except ImportError:
+    raise SkipTest("NumPy not installed")
+
+
+class TestSkylineNp(TestCase):
+
+    def test_init(self):
+        s = skyline_np.SkylineBlNp(20, 50)
+        self.assertEqual(s._skyline, [HSegment(P(0, 0), 20)])
+        self.assertEqual(s.capacity(), (20, 50, 1000))
+
+        s.add_rect(5, 5)
+        s.reset()
+        self.assertEqual(len(s), 0)
+        self.assertEqual(s._skyline, [HSegment(P(0, 0), 20)])
+
+        # Only integer surfaces and rectangles
+        self.assertRaises(ValueError, skyline_np.SkylineBlNp, 20.5, 50)
+        self.assertRaises(ValueError, s.add_rect, 5.5, 5)
+
+    def test_add_rect(self):
+        s = skyline_np.SkylineBlNp(100, 100, rot=False)
+        self.assertEqual(s.add_rect(30, 30), Rectangle(0, 0, 30, 30))
+        self.assertEqual(s.add_rect(100, 70), Rectangle(0, 30, 100, 70))
+        self.assertEqual(s.add_rect(10, 10), None)
+        self.assertEqual(s._skyline, [HSegment(P(0, 100), 100)])
+
+        # Coordinates are returned as python numbers
+        s = skyline_np.SkylineBlNp(100, 10)
+        rect = s.add_rect(10, 100)
+        self.assertEqual(rect, Rectangle(0, 0, 100, 10))
+        self.assertTrue(type(rect.x) is int)
+
+        s = skyline_np.SkylineMwfNp(100, 100)
+        s.add_rect(30, 30)
+        self.assertTrue(type(s.fitness(40, 10)) is int)
+
+    def test_waste_management(self):
+        s = skyline_np.SkylineBlWmNp(100, 100, rot=False)
+        s.add_rect(50, 40)
+        s.add_rect(100, 60)
+        self.assertEqual(s._waste._sections, [Rectangle(50, 0, 50, 40)])
+        self.assertEqual(s.add_rect(50, 40), Rectangle(50, 0, 50, 40))
+
+    def test_same_as_skyline(self):
+        # Same placements, fitness and skyline for integer rectangles
+        variants = [
+            (skyline.SkylineBl, skyline_np.SkylineBlNp),
+            (skyline.SkylineMwf, skyline_np.SkylineMwfNp),
+            (skyline.SkylineMwfl, skyline_np.SkylineMwflNp),
+            (skyline.SkylineBlWm, skyline_np.SkylineBlWmNp),
+            (skyline.SkylineMwfWm, skyline_np.SkylineMwfWmNp),
+            (skyline.SkylineMwflWm, skyline_np.SkylineMwflWmNp)]
+
+        for algo, algo_np in variants:
+            for rot in (True, False):
+                rng = random.Random(1)
+                s, snp = algo(200, 150, rot=rot), algo_np(200, 150, rot=rot)
+                for _ in range(150):
+                    w, h = rng.randint(1, 40), rng.randint(1, 40)
+                    self.assertEqual(s.fitness(w, h), snp.fitness(w, h))
+                    self.assertEqual(s.add_rect(w, h), snp.add_rect(w, h))
+                self.assertEqual(s._skyline, snp._skyline)
+                snp.validate_packing()
+
+    def test_packer(self):
+        p = newPacker(pack_algo=skyline_np.SkylineMwflNp)
+        p.add_bin(100, 100)
+        for _ in range(4):
+            p.add_rect(50, 50)
+        p.pack()
+        p.validate_packing()
+        self.assertEqual(len(p[0]), 4)
+
+    def test_packer_global(self):
+        p = newPacker(bin_algo=PackingBin.Global, pack_algo=skyline_np.SkylineMwflNp)
+        p.add_bin(100, 100)
+        for _ in range(4):
+            p.add_rect(50, 50)
+        p.pack()
+        p.validate_packing()
+        self.assertEqual(len(p[0]), 4)
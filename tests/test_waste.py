@@ -1,4 +1,6 @@
 from unittest import TestCase
+import random
+import operator
 import rectpack.waste as waste
 from rectpack.geometry import Rectangle
 
@@ -56,6 +58,49 @@ class TestWaste(TestCase):
         self.assertEqual(rect.rid, 23)
    
 
+    def test_same_as_scan(self):
+        # Indexed merge and section selection give the same results as
+        # scanning the whole free section list.
+        class ScanWaste(waste.WasteManager):
+            def _add_section(self, section):
+                joined = True
+                while self._merge and joined:
+                    joined = False
+                    for s in list(self._sections):
+                        if section.join(s):
+                            self._remove_section(s)
+                            joined = True
+                self._sections.append(section)
+                self._index_section(section)
+
+            def _select_fittest_section(self, w, h):
+                orientations = [(w, h, False)]
+                if self.rot:
+                    orientations.append((h, w, True))
+                fit = [(self._section_fitness(s, sw, sh), s, rot) 
+                        for sw, sh, rot in orientations for s in self._sections
+                        if self._section_fitness(s, sw, sh) is not None]
+                if not fit:
+                    return None, None
+                _, section, rot = min(fit, key=operator.itemgetter(0))
+                return section, rot
+
+        random.seed(15)
+        for _ in range(20):
+            w, ref = waste.WasteManager(), ScanWaste()
+            cells = [(x, y) for x in range(8) for y in range(8)]
+            random.shuffle(cells)
+            for x, y in cells[:40]:
+                w.add_waste(x*10, y*10, 10, 10)
+                ref.add_waste(x*10, y*10, 10, 10)
+                self.assertEqual(w._sections, ref._sections)
+
+            for _ in range(20):
+                width, height = random.randint(1, 30), random.randint(1, 30)
+                self.assertEqual(w.add_rect(width, height), 
+                        ref.add_rect(width, height))
+                self.assertEqual(w._sections, ref._sections)
+
     def test_iter(self):
         # Iterate through rectangles
         w = waste.WasteManager()